@@ -0,0 +1,32 @@
+"""Embedding cache
+
+Revision ID: 002_embedding_cache
+Revises: 001_consolidated_schema
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+from pgvector.sqlalchemy import Vector
+
+# revision identifiers, used by Alembic.
+revision = '002_embedding_cache'
+down_revision = '001_consolidated_schema'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('embedding_cache',
+        sa.Column('model', sa.String(length=100), nullable=False),
+        sa.Column('dimensions', sa.Integer(), nullable=False),
+        sa.Column('chunk_hash', sa.String(length=64), nullable=False),
+        sa.Column('embedding', Vector(), nullable=False),
+        sa.Column('created_at', TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('model', 'dimensions', 'chunk_hash')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('embedding_cache')
@@ -0,0 +1,35 @@
+"""Unique (repo_id, file_path, chunk_index) on code_embeddings
+
+Revision ID: 003_code_embeddings_unique_chunk
+Revises: 002_embedding_cache
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003_code_embeddings_unique_chunk'
+down_revision = '002_embedding_cache'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Earlier indexing could insert the same chunk key more than once; keep the newest row
+    op.execute("""
+        DELETE FROM code_embeddings ce
+        USING code_embeddings newer
+        WHERE ce.repo_id = newer.repo_id
+          AND ce.file_path = newer.file_path
+          AND ce.chunk_index = newer.chunk_index
+          AND (ce.created_at, ce.id) < (newer.created_at, newer.id)
+    """)
+    op.create_unique_constraint(
+        'uq_code_embeddings_repo_file_chunk',
+        'code_embeddings',
+        ['repo_id', 'file_path', 'chunk_index']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_code_embeddings_repo_file_chunk', 'code_embeddings', type_='unique')
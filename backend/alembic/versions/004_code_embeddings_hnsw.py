@@ -0,0 +1,37 @@
+"""HNSW cosine index on code_embeddings.embedding
+
+Revision ID: 004_code_embeddings_hnsw
+Revises: 003_code_embeddings_unique_chunk
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '004_code_embeddings_hnsw'
+down_revision = '003_code_embeddings_unique_chunk'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Built concurrently so indexing and chat keep working during the (long) build
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_code_embeddings_embedding_hnsw',
+            'code_embeddings',
+            ['embedding'],
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_code_embeddings_embedding_hnsw',
+            table_name='code_embeddings',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,54 @@
+"""halfvec / binary embedding columns with HNSW indexes
+
+Revision ID: 005_code_embeddings_quantized
+Revises: 004_code_embeddings_hnsw
+Create Date: 2026-10-18 00:00:00.000000
+
+Requires pgvector >= 0.7.0 (halfvec type, binary_quantize, bit_hamming_ops).
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import HALFVEC, BIT
+
+# revision identifiers, used by Alembic.
+revision = '005_code_embeddings_quantized'
+down_revision = '004_code_embeddings_hnsw'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_code_embeddings_embedding_half_hnsw', 'embedding_half', 'halfvec_cosine_ops'),
+    ('ix_code_embeddings_embedding_bits_hnsw', 'embedding_bits', 'bit_hamming_ops'),
+]
+
+
+def upgrade() -> None:
+    op.add_column('code_embeddings', sa.Column('embedding_half', HALFVEC(1536), nullable=True))
+    op.add_column('code_embeddings', sa.Column('embedding_bits', BIT(1536), nullable=True))
+
+    # Columns start out empty; rows move over when EMBEDDING_STORAGE is switched
+    with op.get_context().autocommit_block():
+        for name, column, ops in INDEXES:
+            op.create_index(
+                name,
+                'code_embeddings',
+                [column],
+                postgresql_using='hnsw',
+                postgresql_with={'m': 16, 'ef_construction': 64},
+                postgresql_ops={column: ops},
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    # Widen compact rows back before their columns go away
+    op.execute("""
+        UPDATE code_embeddings SET embedding = embedding_half::vector(1536)
+        WHERE embedding IS NULL AND embedding_half IS NOT NULL
+    """)
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.drop_index(name, table_name='code_embeddings', postgresql_concurrently=True)
+    op.drop_column('code_embeddings', 'embedding_bits')
+    op.drop_column('code_embeddings', 'embedding_half')
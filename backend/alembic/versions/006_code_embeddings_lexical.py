@@ -0,0 +1,45 @@
+"""Trigram and full-text indexes on code_embeddings.content
+
+Revision ID: 006_code_embeddings_lexical
+Revises: 005_code_embeddings_quantized
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_code_embeddings_lexical'
+down_revision = '005_code_embeddings_quantized'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        # Substring (LIKE '%ident%') lookups for identifier / quoted queries
+        op.create_index(
+            'ix_code_embeddings_content_trgm',
+            'code_embeddings',
+            ['content'],
+            postgresql_using='gin',
+            postgresql_ops={'content': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+        )
+        # Word matches for natural-language queries; 'simple' since stemming code is unhelpful.
+        # Queries must use this exact expression (see core/rag/lexical.py)
+        op.create_index(
+            'ix_code_embeddings_content_tsv',
+            'code_embeddings',
+            [sa.text("to_tsvector('simple', content)")],
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_code_embeddings_content_tsv', table_name='code_embeddings', postgresql_concurrently=True)
+        op.drop_index('ix_code_embeddings_content_trgm', table_name='code_embeddings', postgresql_concurrently=True)
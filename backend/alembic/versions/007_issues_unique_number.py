@@ -0,0 +1,34 @@
+"""Unique (repo_id, number) on issues
+
+Revision ID: 007_issues_unique_number
+Revises: 006_code_embeddings_lexical
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_issues_unique_number'
+down_revision = '006_code_embeddings_lexical'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Issue sync had no conflict target and could insert the same issue twice; keep the newest row
+    op.execute("""
+        DELETE FROM issues i
+        USING issues newer
+        WHERE i.repo_id = newer.repo_id
+          AND i.number = newer.number
+          AND (i.created_at, i.id) < (newer.created_at, newer.id)
+    """)
+    op.create_unique_constraint('uq_issues_repo_number', 'issues', ['repo_id', 'number'])
+    # GitHub issue ids no longer fit in int4
+    op.alter_column('issues', 'github_id', type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=True)
+
+
+def downgrade() -> None:
+    op.alter_column('issues', 'github_id', type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=True)
+    op.drop_constraint('uq_issues_repo_number', 'issues', type_='unique')
@@ -0,0 +1,26 @@
+"""Issue sync watermark columns on repositories
+
+Revision ID: 008_repository_issue_watermark
+Revises: 007_issues_unique_number
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_repository_issue_watermark'
+down_revision = '007_issues_unique_number'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Both start NULL, so each repo's first sync is a full reconciliation
+    op.add_column('repositories', sa.Column('issues_synced_until', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('repositories', sa.Column('issues_reconciled_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('repositories', 'issues_reconciled_at')
+    op.drop_column('repositories', 'issues_synced_until')
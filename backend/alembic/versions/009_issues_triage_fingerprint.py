@@ -0,0 +1,37 @@
+"""Triage fingerprint on issues
+
+Revision ID: 009_issues_triage_fingerprint
+Revises: 008_repository_issue_watermark
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009_issues_triage_fingerprint'
+down_revision = '008_repository_issue_watermark'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('issues', sa.Column('triage_fingerprint', sa.String(64), nullable=True))
+    # Treat existing triage results as current so deploying this doesn't re-triage
+    # everything. Frozen copy of triage_fingerprint_sql() as of prompt version "1",
+    # with the deployment's TRIAGE_MODEL (the settings default when unset)
+    op.execute(
+        sa.text(r"""
+            UPDATE issues
+            SET triage_fingerprint = encode(sha256(convert_to(
+                concat_ws(E'\x1f', '1', :model, title, coalesce(body, '')), 'UTF8'
+            )), 'hex')
+            WHERE triage_status = 'triaged'
+        """).bindparams(model=os.environ.get("TRIAGE_MODEL", "gemini-2.0-flash"))
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('issues', 'triage_fingerprint')
@@ -0,0 +1,156 @@
+"""
+Chunker micro-benchmarks and golden check.
+
+Compares ChunkingService's fixed-mode chunker against the original
+line-list implementation (ReferenceChunkingService below, copied verbatim)
+on tiny files, 50k-line generated files and files with very long lines.
+Chunk content, indexes and hashes must be identical to the reference.
+Line numbers are checked separately against the file itself, since the
+reference reports them one line too high after the first chunk.
+
+Run from backend/:  python -m benchmarks.bench_chunking
+"""
+import random
+import sys
+import timeit
+
+from repose.core.rag.chunking import Chunk, ChunkingService
+
+
+class ReferenceChunkingService(ChunkingService):
+    """The original fixed-mode ChunkingService.chunk_file, unmodified."""
+
+    def chunk_file(self, file_path: str, content: str) -> list[Chunk]:
+        lines = content.splitlines()
+        chunks = []
+        current_chunk_lines = []
+        current_size = 0
+        start_line = 1
+        chunk_idx = 0
+        
+        language = self._get_language(file_path)
+
+        for i, line in enumerate(lines):
+            line_len = len(line) + 1 # +1 for newline
+            
+            if current_size + line_len > self.chunk_size and current_chunk_lines:
+                # Flush current chunk
+                chunk_text = "\n".join(current_chunk_lines)
+                end_line = start_line + len(current_chunk_lines) - 1
+                
+                chunks.append(Chunk(
+                    content=chunk_text,
+                    file_path=file_path,
+                    index=chunk_idx,
+                    start_line=start_line,
+                    end_line=end_line,
+                    language=language,
+                    chunk_hash=self._hash_text(chunk_text)
+                ))
+                
+                # Start new chunk with overlap
+                # Simple logic: keep last N lines that fit inside overlap size
+                overlap_lines = []
+                overlap_size = 0
+                for l in reversed(current_chunk_lines):
+                    if overlap_size + len(l) + 1 <= self.chunk_overlap:
+                        overlap_lines.insert(0, l)
+                        overlap_size += len(l) + 1
+                    else:
+                        break
+                
+                current_chunk_lines = overlap_lines
+                current_size = overlap_size
+                start_line = (i + 1) - len(current_chunk_lines) + 1
+                chunk_idx += 1
+            
+            current_chunk_lines.append(line)
+            current_size += line_len
+            
+        # Flush last chunk
+        if current_chunk_lines:
+            chunk_text = "\n".join(current_chunk_lines)
+            end_line = start_line + len(current_chunk_lines) - 1
+            chunks.append(Chunk(
+                content=chunk_text,
+                file_path=file_path,
+                index=chunk_idx,
+                start_line=start_line,
+                end_line=end_line,
+                language=language,
+                chunk_hash=self._hash_text(chunk_text)
+            ))
+            
+        return chunks
+
+
+def as_tuples(chunks: list[Chunk]) -> list[tuple]:
+    return [(c.content, c.index, c.chunk_hash) for c in chunks]
+
+
+def lines_match(content: str, chunks: list[Chunk]) -> bool:
+    """Every chunk is exactly lines start_line..end_line of the file."""
+    lines = content.splitlines()
+    return all(c.content == "\n".join(lines[c.start_line - 1:c.end_line]) for c in chunks)
+
+
+def corpus() -> dict[str, str]:
+    rng = random.Random(42)
+    generated = "\n".join(
+        f"    value_{i} = compute(value_{i - 1}, {i})  # step {rng.randint(0, 10**6)}"
+        for i in range(50_000)
+    )
+    long_lines = "\n".join("x" * rng.randint(1_000, 50_000) for _ in range(200))
+    return {
+        "tiny": "def f():\n    return 1\n",
+        "generated_50k_lines": generated,
+        "long_lines": long_lines,
+        "crlf": generated[:200_000].replace("\n", "\r\n"),
+    }
+
+
+def fuzz_cases(n: int = 500) -> list[str]:
+    rng = random.Random(7)
+    alphabet = ["a", "b", " ", "\n", "\n", "\r\n", "\t", "é", "\r", "\x0c"]
+    return ["", "\n", "\n\n", "\r", "a\r\n\r\n"] + [
+        "".join(rng.choice(alphabet) * rng.randint(1, 80) for _ in range(rng.randint(0, 200)))
+        for _ in range(n)
+    ]
+
+
+def golden_check() -> bool:
+    ok = True
+    cases = [(params, fuzz_cases()) for params in [(2000, 200), (50, 20), (10, 10), (100, 0), (30, 60)]]
+    cases.append(((2000, 200), list(corpus().values())))
+    for (chunk_size, overlap), contents in cases:
+        reference = ReferenceChunkingService(chunk_size, overlap)
+        chunker = ChunkingService(chunk_size, overlap)
+        for content in contents:
+            actual = chunker.chunk_file("f.py", content)
+            if as_tuples(reference.chunk_file("f.py", content)) != as_tuples(actual):
+                print(f"MISMATCH chunk_size={chunk_size} overlap={overlap} content={content[:60]!r}")
+                ok = False
+                break
+            if not lines_match(content, actual):
+                print(f"WRONG LINES chunk_size={chunk_size} overlap={overlap} content={content[:60]!r}")
+                ok = False
+                break
+    return ok
+
+
+def bench():
+    reference = ReferenceChunkingService()
+    chunker = ChunkingService()
+    print(f"{'case':<22}{'reference ms':>14}{'current ms':>14}")
+    for name, content in corpus().items():
+        number = 200 if name == "tiny" else 5
+        ref = min(timeit.repeat(lambda: reference.chunk_file("f.py", content), number=number, repeat=3))
+        cur = min(timeit.repeat(lambda: chunker.chunk_file("f.py", content), number=number, repeat=3))
+        print(f"{name:<22}{ref / number * 1000:>14.3f}{cur / number * 1000:>14.3f}")
+
+
+if __name__ == "__main__":
+    if not golden_check():
+        sys.exit(1)
+    print("golden check: chunks identical, line numbers correct")
+    bench()
@@ -0,0 +1,93 @@
+"""
+Recall-versus-latency benchmark for ANN retrieval against the exact path.
+
+Query vectors are sampled from the repository's own stored embeddings
+(lightly perturbed), so no embedding API calls are made. For each
+ef_search value it reports recall@k against exact search, plus p50/p95
+latency.
+
+Run from backend/ against a populated database:
+    python -m benchmarks.bench_retrieval <repo_id> [--queries 50] [--top-k 5]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Optional
+from uuid import UUID
+
+import numpy as np
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import cast, func, select
+
+from repose.core.llm.base import CODE_EMBED_DIM
+from repose.core.rag.retrieval import VectorRetriever
+from repose.db.session import AsyncSessionLocal
+from repose.models.embedding import CodeEmbedding
+
+EF_SEARCH_VALUES = [20, 40, 100, 200, 400]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def sample_queries(db, repo_id: UUID, n: int) -> list[np.ndarray]:
+    # Whichever column the repo's storage mode fills (embedding is NULL under halfvec/binary)
+    source = func.coalesce(CodeEmbedding.embedding, cast(CodeEmbedding.embedding_half, Vector(CODE_EMBED_DIM)))
+    stmt = select(source).filter(
+        CodeEmbedding.repo_id == repo_id,
+        source.is_not(None)
+    ).order_by(func.random()).limit(n)
+    rows = (await db.execute(stmt)).scalars().all()
+    rng = np.random.default_rng(0)
+    queries = []
+    for row in rows:
+        vector = np.asarray(row, dtype=np.float32)
+        # Perturb so the query isn't trivially its own nearest neighbour
+        queries.append(vector + rng.normal(0, 0.01, vector.shape).astype(np.float32))
+    return queries
+
+
+async def run_mode(db, retriever: VectorRetriever, repo_id: UUID, queries, top_k: int, mode: str, ef: Optional[int] = None):
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        rows = await retriever.search(repo_id, q, top_k=top_k, search_mode=mode, ef_search=ef)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([r.id for r in rows])
+        # End the transaction so SET LOCAL doesn't leak into the next query
+        await db.rollback()
+    return latencies, results
+
+
+async def main(repo_id: UUID, n_queries: int, top_k: int):
+    async with AsyncSessionLocal() as db:
+        queries = await sample_queries(db, repo_id, n_queries)
+        if not queries:
+            print("No embeddings found for this repository")
+            return
+        await db.rollback()
+        retriever = VectorRetriever(db)
+
+        exact_lat, exact_ids = await run_mode(db, retriever, repo_id, queries, top_k, "exact")
+        print(f"{'mode':<16}{'recall@' + str(top_k):>10}{'p50 ms':>10}{'p95 ms':>10}")
+        print(f"{'exact':<16}{1.0:>10.3f}{statistics.median(exact_lat):>10.2f}{percentile(exact_lat, 0.95):>10.2f}")
+
+        for ef in EF_SEARCH_VALUES:
+            lat, ids = await run_mode(db, retriever, repo_id, queries, top_k, "ann", ef)
+            recall = statistics.mean(
+                len(set(a) & set(e)) / max(1, len(e)) for a, e in zip(ids, exact_ids)
+            )
+            label = f"ann ef={ef}"
+            print(f"{label:<16}{recall:>10.3f}{statistics.median(lat):>10.2f}{percentile(lat, 0.95):>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("repo_id", type=UUID)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.repo_id, args.queries, args.top_k))
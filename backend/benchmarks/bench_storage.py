@@ -0,0 +1,138 @@
+"""
+Size / latency / recall benchmark for the embedding storage modes.
+
+Copies one repository's embeddings into a scratch table per storage mode
+(full, halfvec, binary), builds the matching HNSW index, and reports table
+size, index size, p50/p95 latency and recall@k against exact float32
+search. The compact modes use the same two-stage coarse search + re-rank as
+VectorRetriever. Scratch tables are temporary and the transaction is rolled
+back, so code_embeddings is never modified.
+
+Run from backend/ against a populated database:
+    python -m benchmarks.bench_storage <repo_id> [--queries 50] [--top-k 5] [--rerank-factor 8]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import UUID
+
+import numpy as np
+from pgvector import Vector
+from sqlalchemy import text
+
+from repose.core.llm.base import CODE_EMBED_DIM
+from repose.core.rag.storage import STORAGE_MODES, quantize_binary, storage_expressions
+from repose.db.session import AsyncSessionLocal
+
+EF_SEARCH = 100
+
+INDEX_OPS = {
+    "full": ("embedding", "vector_cosine_ops"),
+    "halfvec": ("embedding_half", "halfvec_cosine_ops"),
+    "binary": ("embedding_bits", "bit_hamming_ops"),
+}
+
+SOURCE = f"COALESCE(embedding, embedding_half::vector({CODE_EMBED_DIM}))"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def search_sql(storage: str, top_k: int, n_candidates: int) -> str:
+    table = f"bench_{storage}"
+    if storage == "full":
+        return f"SELECT id FROM {table} ORDER BY embedding <=> :q LIMIT {top_k}"
+    coarse = "embedding_half <=> CAST(:q AS halfvec)" if storage == "halfvec" else f"embedding_bits <~> CAST(CAST(:bits AS text) AS bit({CODE_EMBED_DIM}))"
+    return f"""
+        SELECT b.id FROM {table} b
+        JOIN (SELECT id FROM {table} ORDER BY {coarse} LIMIT {n_candidates}) c ON b.id = c.id
+        ORDER BY b.embedding_half::vector <=> :q LIMIT {top_k}
+    """
+
+
+async def build_table(db, repo_id: UUID, storage: str) -> tuple[int, int]:
+    table = f"bench_{storage}"
+    columns = storage_expressions(storage, SOURCE)
+    await db.execute(text(f"DROP TABLE IF EXISTS {table}"))
+    await db.execute(text(f"""
+        CREATE TEMP TABLE {table} (
+            id uuid PRIMARY KEY,
+            embedding vector({CODE_EMBED_DIM}),
+            embedding_half halfvec({CODE_EMBED_DIM}),
+            embedding_bits bit({CODE_EMBED_DIM})
+        )
+    """))
+    await db.execute(text(f"""
+        INSERT INTO {table} (id, {", ".join(columns)})
+        SELECT id, {", ".join(columns.values())}
+        FROM code_embeddings
+        WHERE repo_id = :repo_id AND (embedding IS NOT NULL OR embedding_half IS NOT NULL)
+    """), {"repo_id": repo_id})
+    column, ops = INDEX_OPS[storage]
+    await db.execute(text(f"CREATE INDEX ON {table} USING hnsw ({column} {ops}) WITH (m = 16, ef_construction = 64)"))
+    await db.execute(text(f"ANALYZE {table}"))
+    sizes = await db.execute(text(f"SELECT pg_table_size('{table}'), pg_indexes_size('{table}')"))
+    return tuple(sizes.one())
+
+
+async def run_queries(db, sql: str, queries: list[np.ndarray]) -> tuple[list[float], list[list]]:
+    latencies, results = [], []
+    for q in queries:
+        params = {"q": Vector(q).to_text(), "bits": quantize_binary(q)}
+        start = time.perf_counter()
+        rows = (await db.execute(text(sql), params)).scalars().all()
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(rows)
+    return latencies, results
+
+
+async def main(repo_id: UUID, n_queries: int, top_k: int, rerank_factor: int):
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(text(f"""
+            SELECT {SOURCE} FROM code_embeddings
+            WHERE repo_id = :repo_id AND (embedding IS NOT NULL OR embedding_half IS NOT NULL)
+            ORDER BY random() LIMIT :n
+        """), {"repo_id": repo_id, "n": n_queries})).scalars().all()
+        if not rows:
+            print("No embeddings found for this repository")
+            return
+        rng = np.random.default_rng(0)
+        # Perturb so the query isn't trivially its own nearest neighbour
+        queries = [
+            np.asarray(Vector._from_db(r), dtype=np.float32) + rng.normal(0, 0.01, CODE_EMBED_DIM).astype(np.float32)
+            for r in rows
+        ]
+
+        sizes = {}
+        for storage in STORAGE_MODES:
+            sizes[storage] = await build_table(db, repo_id, storage)
+        # Everything runs in one transaction (temp tables are per connection), so
+        # the plain SETs below are rolled back with it when the session closes.
+        # Exact float32 ground truth first, with index scans disabled.
+        await db.execute(text("SET enable_indexscan = off"))
+        _, truth = await run_queries(db, search_sql("full", top_k, 0), queries)
+        await db.execute(text("SET enable_indexscan = on"))
+        await db.execute(text(f"SET hnsw.ef_search = {EF_SEARCH}"))
+
+        print(f"{'storage':<10}{'table MB':>10}{'index MB':>10}{'recall@' + str(top_k):>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for storage in STORAGE_MODES:
+            lat, ids = await run_queries(db, search_sql(storage, top_k, top_k * rerank_factor), queries)
+            recall = statistics.mean(len(set(a) & set(e)) / max(1, len(e)) for a, e in zip(ids, truth))
+            table_mb, index_mb = (size / 2**20 for size in sizes[storage])
+            print(
+                f"{storage:<10}{table_mb:>10.1f}{index_mb:>10.1f}{recall:>10.3f}"
+                f"{statistics.median(lat):>10.2f}{percentile(lat, 0.95):>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("repo_id", type=UUID)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--rerank-factor", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.repo_id, args.queries, args.top_k, args.rerank_factor))
@@ -1,8 +1,20 @@
 from typing import AsyncGenerator
-from fastapi import Depends
+from fastapi import Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
+from repose.core.config import settings
+from repose.core.llm import LLMClient, LLMClientRegistry
 from repose.db.session import AsyncSessionLocal
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
+
+def get_llm_registry(request: Request) -> LLMClientRegistry:
+    # Created in the app lifespan (main.py)
+    return request.app.state.llm_registry
+
+def get_chat_llm(registry: LLMClientRegistry = Depends(get_llm_registry)) -> LLMClient:
+    return registry.get(settings.CHAT_MODEL)
+
+def get_triage_llm(registry: LLMClientRegistry = Depends(get_llm_registry)) -> LLMClient:
+    return registry.get(settings.TRIAGE_MODEL)
@@ -7,8 +7,10 @@ from typing import List
 
 from repose.api import deps
 from repose.core.config import settings
-from repose.core.llm import create_llm_client, LLMConfig
+from repose.core.llm import LLMClient
+from repose.core.rag.answer_cache import AnswerCache, CachedAnswer
 from repose.core.rag.context_engine import ContextEngine
+from repose.models.repository import Repository
 
 router = APIRouter()
 
@@ -16,21 +18,28 @@ router = APIRouter()
 class ChatRequest(BaseModel):
     repo_id: UUID
     message: str
+    # False forces a fresh answer (and doesn't cache it)
+    use_cache: bool = True
 
 
 @router.post("/query")
 async def chat_query(
     request: ChatRequest,
     db: AsyncSession = Depends(deps.get_db),
+    llm_client: LLMClient = Depends(deps.get_chat_llm),
 ):
-    # Initialize LLM Client
-    # In prod, this might be a singleton or cached
-    llm_config = LLMConfig(
-        provider="gemini",
-        model="gemini-2.5-flash", # user specified placeholder or preference
-        api_key=settings.GEMINI_API_KEY
-    )
-    llm_client = create_llm_client(llm_config)
+    # Answers are cached per indexed commit, so only once the repo has been indexed
+    repo = await db.get(Repository, request.repo_id)
+    commit_sha = repo.last_commit_sha if repo else None
+    answer_cache = AnswerCache(model=llm_client.config.model)
+    use_cache = settings.ANSWER_CACHE_ENABLED and request.use_cache and commit_sha is not None
+    
+    if use_cache:
+        cached = await answer_cache.get(request.repo_id, commit_sha, request.message)
+        if cached:
+            async def replay():
+                yield cached.response
+            return StreamingResponse(replay(), media_type="text/plain", headers={"X-Answer-Cache": "hit"})
     
     context_engine = ContextEngine(db, llm_client)
     
@@ -48,12 +57,29 @@ async def chat_query(
         # But standard formatting makes handling mixed types hard for simple clients.
         # Let's just stream text for now, and maybe format sources at the end.
         
-        yield f"**Sources:**\n"
+        streamed = []
+        
+        def emit(text: str) -> str:
+            streamed.append(text)
+            return text
+        
+        yield emit(f"**Sources:**\n")
         for s in sources:
-            yield f"- `{s.file_path}` ({s.start_line}-{s.end_line})\n"
-        yield "\n---\n"
+            yield emit(f"- `{s.file_path}` ({s.start_line}-{s.end_line})\n")
+        yield emit("\n---\n")
         
         async for chunk in stream_gen:
-            yield chunk
+            yield emit(chunk)
+        
+        # Only reached if the whole answer streamed (no error, client still connected)
+        if use_cache:
+            await answer_cache.put(request.repo_id, commit_sha, request.message, CachedAnswer(
+                response="".join(streamed),
+                sources=[
+                    {"file_path": s.file_path, "start_line": s.start_line, "end_line": s.end_line}
+                    for s in sources
+                ],
+            ))
 
-    return StreamingResponse(response_generator(), media_type="text/plain")
+    headers = {"X-Answer-Cache": "miss" if use_cache else "bypass"}
+    return StreamingResponse(response_generator(), media_type="text/plain", headers=headers)
@@ -3,6 +3,9 @@ from pydantic import BaseModel
 import psutil
 import random
 
+from repose.core.config import settings
+from repose.core.rag.embedding_cache import QueryEmbeddingCache
+
 router = APIRouter()
 
 class MetricsData(BaseModel):
@@ -26,3 +29,28 @@ async def get_system_metrics():
         requests_per_hour=mock_requests,
         latency_p95=random.uniform(0.1, 0.5)
     )
+
+
+class QueryEmbeddingCacheStats(BaseModel):
+    enabled: bool
+    memory_hits: int
+    redis_hits: int
+    misses: int
+    hit_rate: float
+    # This worker's in-process LRU only
+    memory_entries: int
+
+
+@router.get("/query-embedding-cache", response_model=QueryEmbeddingCacheStats)
+async def get_query_embedding_cache_stats():
+    """
+    Hit/miss counters for the query embedding cache, summed over all workers.
+    """
+    counts = await QueryEmbeddingCache.shared_stats()
+    lookups = sum(counts.values())
+    return QueryEmbeddingCacheStats(
+        enabled=settings.QUERY_EMBEDDING_CACHE_ENABLED,
+        hit_rate=(counts["memory_hits"] + counts["redis_hits"]) / lookups if lookups else 0.0,
+        memory_entries=len(QueryEmbeddingCache._memory),
+        **counts,
+    )
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
 from repose.api import deps
@@ -9,6 +9,7 @@ from repose.models.repository import Repository as RepoModel
 from repose.schemas.repository import Repository, RepositoryCreate
 from repose.core.config import settings
 from repose.integrations.github import GitHubClient
+from repose.integrations.github_rate_limit import GitHubRateLimitError
 from repose.workers.tasks import sync_repository
 
 router = APIRouter()
@@ -21,13 +22,15 @@ async def get_available_repos():
     if not settings.GITHUB_USERNAME:
         raise HTTPException(status_code=400, detail="GITHUB_USERNAME not configured")
     
-    client = GitHubClient(token=settings.GITHUB_PAT)
+    client = GitHubClient(token=settings.GITHUB_PAT, priority="interactive")
     try:
         repos = await client.get_user_repos(settings.GITHUB_USERNAME)
         # Filter/Map to a simpler schema if needed, strictly passing through for now 
         # but logically we might want to return just what the frontend needs.
         # Front end generic generic list.
         return repos
+    except GitHubRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -90,6 +93,7 @@ async def sync_repository_endpoint(
 @router.post("/{repo_id}/sync-issues")
 async def sync_repo_issues_endpoint(
     repo_id: UUID,
+    full: Optional[bool] = None, # force (true) or skip (false) a full reconciliation
     db: AsyncSession = Depends(deps.get_db),
 ):
     repo_result = await db.execute(select(RepoModel).filter(RepoModel.id == repo_id))
@@ -97,7 +101,7 @@ async def sync_repo_issues_endpoint(
     if not repo:
         raise HTTPException(status_code=404, detail="Repository not found")
         
-    from app.workers.tasks import sync_repo_issues
-    task = sync_repo_issues.delay(str(repo_id))
+    from repose.workers.tasks import sync_repo_issues
+    task = sync_repo_issues.delay(str(repo_id), full=full)
     
     return {"message": "Issue Sync started", "task_id": task.id}
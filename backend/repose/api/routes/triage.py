@@ -1,13 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 from uuid import UUID
 
 from repose.api import deps
-from repose.core.config import settings
-from repose.core.llm import create_llm_client, LLMConfig
+from repose.core.llm import LLMClient
 from repose.core.triage.service import TriageService
 from repose.models.issue import Issue
 
@@ -41,7 +40,9 @@ async def list_issues(
 @router.post("/issues/{issue_id}/analyze")
 async def analyze_issue_endpoint(
     issue_id: UUID,
-    db: AsyncSession = Depends(deps.get_db)
+    force: bool = False, # re-run even if the issue is unchanged since its last triage
+    db: AsyncSession = Depends(deps.get_db),
+    llm_client: LLMClient = Depends(deps.get_triage_llm)
 ):
     stmt = select(Issue).filter(Issue.id == issue_id)
     result = await db.execute(stmt)
@@ -50,15 +51,14 @@ async def analyze_issue_endpoint(
     if not issue:
         raise HTTPException(status_code=404, detail="Issue not found")
         
-    # Init LLM
-    llm_config = LLMConfig(
-        provider="gemini",
-        model="gemini-2.0-flash",
-        api_key=settings.GEMINI_API_KEY
-    )
-    llm_client = create_llm_client(llm_config)
-    
     service = TriageService(db, llm_client)
-    analyzed_issue = await service.analyze_issue(issue)
+    analyzed_issue = await service.analyze_issue(issue, force=force)
     
     return analyzed_issue
+
+@router.post("/issues/analyze-pending")
+async def analyze_pending_issues_endpoint(repo_id: Optional[UUID] = None):
+    from repose.workers.tasks import triage_pending_issues
+    task = triage_pending_issues.delay(str(repo_id) if repo_id else None)
+    
+    return {"message": "Batch triage started", "task_id": task.id}
@@ -1,12 +1,10 @@
-import os
-
 from celery import Celery
 
 from repose.core.config import settings
 
 # Celery Configuration
 # Use Redis as both broker and backend
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_URL = settings.REDIS_URL
 
 celery_app = Celery("repose", broker=REDIS_URL, backend=REDIS_URL)
 
@@ -0,0 +1,152 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID
+
+from sqlalchemy import Integer, all_, bindparam, or_, func, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repose.core.config import settings
+from repose.integrations.github import GitHubClient, MAX_PER_PAGE
+from repose.models.issue import Issue
+from repose.models.repository import Repository
+
+# Columns refreshed from GitHub on every sync; a row is only rewritten if one of these differs
+SYNCED_COLUMNS = ("title", "body", "state")
+
+
+@dataclass
+class IssueSyncResult:
+    # "incremental" (since the watermark) or "full" (reconciliation)
+    mode: str = "incremental"
+    fetched: int = 0
+    # Rows inserted or actually changed
+    written: int = 0
+    # Open issues closed locally because a full pass no longer listed them
+    closed: int = 0
+    newest_update: Optional[datetime] = None
+    numbers: set[int] = field(default_factory=set)
+
+
+def issue_row(repo_id: UUID, data: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "repo_id": repo_id,
+        "github_id": data["id"],
+        "number": data["number"],
+        "title": data["title"],
+        "body": data["body"] or "",
+        "state": data["state"],
+        "html_url": data["html_url"],
+    }
+
+
+async def upsert_issues(db: AsyncSession, rows: list[dict[str, Any]]) -> int:
+    """
+    One INSERT ... ON CONFLICT (repo_id, number) for the whole batch.
+    Existing rows are only updated (and updated_at bumped) when a synced
+    column changed. Returns the number of rows inserted or updated.
+    """
+    # A conflict target can't be hit twice in one statement; last copy wins
+    rows = list({(row["repo_id"], row["number"]): row for row in rows}.values())
+    if not rows:
+        return 0
+
+    stmt = insert(Issue).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_issues_repo_number",
+        set_={
+            **{column: stmt.excluded[column] for column in SYNCED_COLUMNS},
+            "github_id": stmt.excluded.github_id,
+            "html_url": stmt.excluded.html_url,
+            # onupdate doesn't fire for ON CONFLICT updates
+            "updated_at": func.now(),
+        },
+        where=or_(*(getattr(Issue, column).is_distinct_from(stmt.excluded[column]) for column in SYNCED_COLUMNS)),
+    )
+    result = await db.execute(stmt)
+    return result.rowcount
+
+
+async def sync_issues(
+    db: AsyncSession,
+    repo_id: UUID,
+    issues: AsyncIterator[dict[str, Any]],
+    batch_size: int = MAX_PER_PAGE
+) -> IssueSyncResult:
+    """
+    Streams issues from GitHub into the DB, one upsert per page-sized batch.
+    Pull requests (which GitHub lists as issues) are skipped.
+    """
+    result = IssueSyncResult()
+    batch = []
+    async for data in issues:
+        # PRs still move the watermark, or they'd be re-listed on every sync
+        updated = datetime.fromisoformat(data["updated_at"].replace("Z", "+00:00"))
+        if result.newest_update is None or updated > result.newest_update:
+            result.newest_update = updated
+        if "pull_request" in data:
+            continue
+        batch.append(issue_row(repo_id, data))
+        result.fetched += 1
+        result.numbers.add(data["number"])
+        if len(batch) >= batch_size:
+            result.written += await upsert_issues(db, batch)
+            batch = []
+    result.written += await upsert_issues(db, batch)
+    return result
+
+
+async def close_missing_issues(db: AsyncSession, repo_id: UUID, open_numbers: set[int]) -> int:
+    """Closes locally-open issues missing from a full open listing (closed, transferred or deleted)."""
+    stmt = update(Issue).where(
+        Issue.repo_id == repo_id,
+        Issue.state == "open",
+        Issue.number != all_(bindparam("open_numbers", list(open_numbers), type_=ARRAY(Integer)))
+    ).values(state="closed", updated_at=func.now())
+    result = await db.execute(stmt)
+    return result.rowcount
+
+
+def needs_reconcile(repo: Repository, now: Optional[datetime] = None) -> bool:
+    if repo.issues_synced_until is None or repo.issues_reconciled_at is None:
+        return True
+    now = now or datetime.now(timezone.utc)
+    return now - repo.issues_reconciled_at >= timedelta(hours=settings.ISSUE_RECONCILE_INTERVAL_HOURS)
+
+
+async def sync_repository_issues(
+    db: AsyncSession,
+    client: GitHubClient,
+    repo: Repository,
+    full: Optional[bool] = None
+) -> IssueSyncResult:
+    """
+    Brings a repo's issues up to date.
+    Incremental: issues?state=all&since=<watermark>, so edits and closures
+    since the last sync are applied and nothing else is fetched.
+    Full (first sync, every ISSUE_RECONCILE_INTERVAL_HOURS, or full=True):
+    lists every open issue and closes local ones GitHub no longer lists.
+    The watermark advances to the newest updated_at seen, in the same
+    transaction as the writes.
+    """
+    if full is None:
+        full = needs_reconcile(repo)
+
+    if full:
+        issues = client.iter_repository_issues(repo.org_name, repo.repo_name, state="open")
+    else:
+        issues = client.iter_repository_issues(
+            repo.org_name, repo.repo_name, state="all", since=repo.issues_synced_until
+        )
+    result = await sync_issues(db, repo.id, issues)
+    result.mode = "full" if full else "incremental"
+
+    if full:
+        result.closed = await close_missing_issues(db, repo.id, result.numbers)
+        repo.issues_reconciled_at = datetime.now(timezone.utc)
+    # `since` is inclusive, so the newest issue comes back once more next time (a no-op upsert)
+    if result.newest_update and (repo.issues_synced_until is None or result.newest_update > repo.issues_synced_until):
+        repo.issues_synced_until = result.newest_update
+    await db.commit()
+    return result
@@ -14,3 +14,7 @@ def create_llm_client(config: LLMConfig) -> LLMClient:
         raise ValueError(f"Unknown LLM provider: {config.provider}")
     
     return client_class(config)
+
+
+# After create_llm_client, which the registry uses
+from .registry import LLMClientRegistry
@@ -2,6 +2,8 @@ from abc import ABC, abstractmethod
 from typing import Any, AsyncIterator, Optional
 from dataclasses import dataclass
 
+from .embedding_executor import EmbeddingExecutor, ThrottleBackoff
+
 CODE_EMBED_DIM = 1536
 
 @dataclass
@@ -11,6 +13,14 @@ class LLMConfig:
     api_key: str
     temperature: float = 0.7
     max_tokens: int = 4096
+    # Prompt budget for retrieved code context (see rag/context_assembly.py)
+    context_token_budget: int = 6000
+    # Embedding throughput controls (0 disables the per-minute limits)
+    embed_max_concurrency: int = 4
+    embed_requests_per_minute: int = 0
+    embed_tokens_per_minute: int = 0
+    embed_batch_max_chars: int = 60_000
+    embed_batch_max_items: int = 100
 
 @dataclass  
 class Message:
@@ -34,6 +44,18 @@ class LLMClient(ABC):
     
     def __init__(self, config: LLMConfig):
         self.config = config
+        # Providers with a dedicated embedding model override this
+        self.embed_model = config.model
+        self.embedding_executor = EmbeddingExecutor(
+            embed_batch=self._embed_batch,
+            retry_delay=self._retry_delay,
+            max_concurrency=config.embed_max_concurrency,
+            requests_per_minute=config.embed_requests_per_minute,
+            tokens_per_minute=config.embed_tokens_per_minute,
+            batch_max_chars=config.embed_batch_max_chars,
+            batch_max_items=config.embed_batch_max_items,
+        )
+        self.completion_backoff = ThrottleBackoff(self._retry_delay, label="Completion request")
     
     @abstractmethod
     async def complete(
@@ -44,6 +66,14 @@ class LLMClient(ABC):
         """Generate a completion."""
         pass
     
+    async def complete_with_retry(
+        self,
+        messages: list[Message],
+        tools: Optional[list[dict]] = None
+    ) -> CompletionResult:
+        """complete(), backing off and retrying on throttling errors (for background work)."""
+        return await self.completion_backoff.call(lambda: self.complete(messages, tools))
+    
     @abstractmethod
     async def stream_complete(
         self,
@@ -58,7 +88,32 @@ class LLMClient(ABC):
         """Generate embedding for a single text."""
         pass
     
-    @abstractmethod
     async def generate_embeddings(self, texts: list[str]) -> list[list[float]]:
-        """Generate embeddings for multiple texts (batched)."""
+        """Generate embeddings for multiple texts (batched, concurrent, rate limited)."""
+        if not texts:
+            return []
+        return await self.embedding_executor.run(texts)
+    
+    @abstractmethod
+    async def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Embed one provider-sized batch in a single request."""
+        pass
+    
+    async def warm_up(self):
+        """Opens the provider connection (DNS, TLS) ahead of the first real request."""
         pass
+    
+    async def health_check(self) -> bool:
+        """Cheap round-trip to the provider; True if it answered."""
+        return True
+    
+    async def aclose(self):
+        """Releases the client's HTTP connection pools."""
+        pass
+    
+    def _retry_delay(self, error: Exception) -> Optional[float]:
+        """
+        Returns a minimum delay in seconds if the error is a retryable
+        throttling error (429/503), or None if it should be raised.
+        """
+        return None
@@ -0,0 +1,151 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Rough chars-per-token ratio used for budgeting; exact counts would need a provider round-trip
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at `per_minute` tokens per minute.
+    A rate of 0 disables limiting.
+    """
+
+    def __init__(self, per_minute: int):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1):
+        if self.rate <= 0:
+            return
+        # A single oversized request may take the whole bucket but never more
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+
+class ThrottleBackoff:
+    """
+    Retries calls that fail with a throttling error (429/503).
+    Exponential backoff with full jitter, never shorter than the server hint.
+    A throttled response pauses every caller sharing this object, not just
+    the one that saw it. Used for embeddings and background completions.
+    """
+
+    def __init__(
+        self,
+        retry_delay: Callable[[Exception], Optional[float]],
+        max_retries: int = 6,
+        label: str = "Request",
+    ):
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        self.label = label
+        self._paused_until = 0.0
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            await self.wait()
+            try:
+                return await fn()
+            except Exception as e:
+                suggested = self.retry_delay(e)
+                if suggested is None or attempt >= self.max_retries:
+                    raise
+                delay = max(suggested, random.uniform(0, min(60.0, 2 ** attempt)))
+                attempt += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                print(f"{self.label} throttled ({e}); backing off {delay:.1f}s")
+
+    async def wait(self):
+        while (remaining := self._paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(remaining)
+
+
+class EmbeddingExecutor:
+    """
+    Runs embedding requests concurrently while respecting provider quotas.
+
+    - Inputs are packed into batches bounded by total characters and item count.
+    - Up to max_concurrency batches are in flight at once.
+    - Request- and token-per-minute buckets pace requests before the provider has to reject them.
+    - Throttling errors (429/503) pause every worker with exponential backoff and jitter.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[list[str]], Awaitable[list[list[float]]]],
+        retry_delay: Callable[[Exception], Optional[float]],
+        max_concurrency: int = 4,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        batch_max_chars: int = 60_000,
+        batch_max_items: int = 100,
+        max_retries: int = 6,
+    ):
+        self.embed_batch = embed_batch
+        self.batch_max_chars = batch_max_chars
+        self.batch_max_items = batch_max_items
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._backoff = ThrottleBackoff(retry_delay, max_retries, label="Embedding request")
+
+    def make_batches(self, texts: list[str]) -> list[list[int]]:
+        """Groups input indexes into batches sized by total characters."""
+        batches: list[list[int]] = []
+        current: list[int] = []
+        current_chars = 0
+        for i, text in enumerate(texts):
+            size = len(text)
+            if current and (current_chars + size > self.batch_max_chars or len(current) >= self.batch_max_items):
+                batches.append(current)
+                current, current_chars = [], 0
+            current.append(i)
+            current_chars += size
+        if current:
+            batches.append(current)
+        return batches
+
+    async def run(self, texts: list[str]) -> list[list[float]]:
+        results: list[Optional[list[float]]] = [None] * len(texts)
+
+        async def run_batch(indexes: list[int]):
+            batch = [texts[i] for i in indexes]
+            embeddings = await self._call_with_retry(batch)
+            for i, embedding in zip(indexes, embeddings):
+                results[i] = embedding
+
+        await asyncio.gather(*(run_batch(b) for b in self.make_batches(texts)))
+        return results
+
+    async def _call_with_retry(self, batch: list[str]) -> list[list[float]]:
+        tokens = sum(estimate_tokens(t) for t in batch)
+
+        async def attempt() -> list[list[float]]:
+            # Quotas are spent per attempt, after any throttling pause
+            await self._requests.acquire(1)
+            await self._tokens.acquire(tokens)
+            return await self.embed_batch(batch)
+
+        async with self._semaphore:
+            return await self._backoff.call(attempt)
@@ -1,6 +1,6 @@
 from typing import AsyncIterator, Optional, Any
 import google.genai as genai
-from google.genai import types
+from google.genai import errors, types
 
 from .base import LLMClient, LLMConfig, Message, CompletionResult, CODE_EMBED_DIM
 
@@ -127,18 +127,32 @@ class GeminiClient(LLMClient):
         )
         return result.embeddings[0].values
     
-    async def generate_embeddings(self, texts: list[str]) -> list[list[float]]:
-        # Batch embedding requests
-        # Note: Check API limits for batch size, often 100 or so
-        results = []
-        batch_size = 100
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            result = await self.client.aio.models.embed_content(
-                model=self.embed_model,
-                config=types.EmbedContentConfig(output_dimensionality=CODE_EMBED_DIM),
-                contents=batch
-            )
-            # result.embeddings is a list of ContentEmbedding
-            results.extend([e.values for e in result.embeddings])
-        return results
+    async def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        result = await self.client.aio.models.embed_content(
+            model=self.embed_model,
+            config=types.EmbedContentConfig(output_dimensionality=CODE_EMBED_DIM),
+            contents=texts
+        )
+        # result.embeddings is a list of ContentEmbedding
+        return [e.values for e in result.embeddings]
+    
+    async def warm_up(self):
+        await self.health_check()
+    
+    async def health_check(self) -> bool:
+        # Model metadata lookup: authenticated, tiny, and doesn't spend tokens
+        try:
+            await self.client.aio.models.get(model=self.model)
+            return True
+        except Exception as e:
+            print(f"Gemini health check failed for {self.model}: {e}")
+            return False
+    
+    async def aclose(self):
+        await self.client.aio.aclose()
+        self.client.close()
+    
+    def _retry_delay(self, error: Exception) -> Optional[float]:
+        if isinstance(error, errors.APIError) and error.code in (429, 503):
+            return 1.0
+        return None
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Optional
+
+from repose.core.config import settings
+
+from . import create_llm_client
+from .base import LLMClient, LLMConfig
+
+
+def _api_key(provider: str) -> Optional[str]:
+    keys = {
+        "gemini": settings.GEMINI_API_KEY,
+    }
+    return keys.get(provider)
+
+
+class LLMClientRegistry:
+    """
+    Process-wide LLM clients, one per (provider, model).
+    Clients hold the provider SDK's HTTP connection pool, so reusing them keeps
+    connections and TLS sessions alive across requests. The API creates one in
+    its lifespan; Celery workers keep one per process (workers/runtime.py).
+    """
+
+    def __init__(self):
+        self._clients: dict[tuple[str, str], LLMClient] = {}
+
+    def get(self, model: str, provider: str = settings.LLM_PROVIDER) -> LLMClient:
+        key = (provider, model)
+        client = self._clients.get(key)
+        if client is None:
+            client = create_llm_client(LLMConfig(
+                provider=provider,
+                model=model,
+                api_key=_api_key(provider),
+                context_token_budget=settings.CHAT_CONTEXT_TOKEN_BUDGETS.get(model, settings.CHAT_CONTEXT_TOKEN_BUDGET),
+                embed_max_concurrency=settings.EMBED_MAX_CONCURRENCY,
+                embed_requests_per_minute=settings.EMBED_RPM,
+                embed_tokens_per_minute=settings.EMBED_TPM,
+            ))
+            self._clients[key] = client
+        return client
+
+    async def warm_up(self, models: list[str], provider: str = settings.LLM_PROVIDER):
+        """Creates and connects clients for the given models; failures are only logged."""
+        async def _warm(model: str):
+            try:
+                await self.get(model, provider).warm_up()
+            except Exception as e:
+                print(f"Error warming up LLM client {provider}/{model}: {e}")
+
+        await asyncio.gather(*(_warm(model) for model in models))
+
+    async def health(self) -> dict[str, bool]:
+        keys = list(self._clients)
+        results = await asyncio.gather(*(self._clients[k].health_check() for k in keys))
+        return {f"{provider}/{model}": ok for (provider, model), ok in zip(keys, results)}
+
+    async def aclose(self):
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                print(f"Error closing LLM client: {e}")
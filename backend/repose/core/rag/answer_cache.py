@@ -0,0 +1,76 @@
+import hashlib
+import json
+import unicodedata
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+
+from repose.core.config import settings
+from repose.core.redis import get_redis
+
+
+@dataclass
+class CachedAnswer:
+    # Exactly what was streamed to the client (sources header + answer)
+    response: str
+    sources: list[dict]
+
+
+class AnswerCache:
+    """
+    Redis cache of complete chat answers, keyed on repo, indexed commit SHA,
+    normalised question and model. A new commit means new keys, so answers
+    never outlive the code they were generated from; invalidate_repo() drops
+    the old ones eagerly when a sync advances the SHA.
+    """
+
+    KEY_PREFIX = "repose:answer:"
+
+    def __init__(self, model: str, ttl_seconds: int = settings.ANSWER_CACHE_TTL_SECONDS):
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def normalise(question: str) -> str:
+        # Case, spacing and trailing punctuation don't change the answer
+        return " ".join(unicodedata.normalize("NFC", question).casefold().split()).rstrip("?!. ")
+
+    @classmethod
+    def _repo_keys(cls, repo_id: UUID) -> str:
+        # Set of every answer key stored for the repo, for invalidation
+        return f"{cls.KEY_PREFIX}keys:{repo_id}"
+
+    def _key(self, repo_id: UUID, commit_sha: str, question: str) -> str:
+        digest = hashlib.sha256(f"{self.model}\0{self.normalise(question)}".encode("utf-8")).hexdigest()
+        return f"{self.KEY_PREFIX}{repo_id}:{commit_sha}:{digest}"
+
+    async def get(self, repo_id: UUID, commit_sha: str, question: str) -> Optional[CachedAnswer]:
+        try:
+            data = await get_redis().get(self._key(repo_id, commit_sha, question))
+        except Exception as e:
+            print(f"Error reading answer cache: {e}")
+            return None
+        if data is None:
+            return None
+        return CachedAnswer(**json.loads(data))
+
+    async def put(self, repo_id: UUID, commit_sha: str, question: str, answer: CachedAnswer):
+        key = self._key(repo_id, commit_sha, question)
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                pipe.set(key, json.dumps({"response": answer.response, "sources": answer.sources}), ex=self.ttl_seconds)
+                pipe.sadd(self._repo_keys(repo_id), key)
+                pipe.expire(self._repo_keys(repo_id), self.ttl_seconds)
+                await pipe.execute()
+        except Exception as e:
+            print(f"Error writing answer cache: {e}")
+
+    @classmethod
+    async def invalidate_repo(cls, repo_id: UUID):
+        """Drops every cached answer for the repo (all commits and models)."""
+        try:
+            redis = get_redis()
+            keys = await redis.smembers(cls._repo_keys(repo_id))
+            await redis.delete(cls._repo_keys(repo_id), *keys)
+        except Exception as e:
+            print(f"Error invalidating answer cache for repo {repo_id}: {e}")
@@ -0,0 +1,163 @@
+import uuid
+import weakref
+from typing import Any
+from uuid import UUID
+
+from pgvector import Vector
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repose.core.config import settings
+from repose.core.rag.chunking import Chunk
+from repose.core.rag.storage import VECTOR_COLUMNS, storage_expressions, storage_values, validate_storage
+from repose.models.embedding import CodeEmbedding
+
+STAGE_TABLE = "code_embeddings_stage"
+
+STAGE_COLUMNS = [
+    "id", "repo_id", "file_path", "chunk_index", "chunk_hash",
+    "content", "embedding", "language", "start_line", "end_line",
+]
+
+CREATE_STAGE = f"""
+    CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE}
+    (LIKE code_embeddings INCLUDING DEFAULTS)
+    ON COMMIT DELETE ROWS
+"""
+
+# Stage columns copied straight through; the vector columns are derived per storage mode
+MERGE_PASSTHROUGH = [c for c in STAGE_COLUMNS if c != "embedding"]
+
+
+def merge_stage_sql(storage: str) -> str:
+    """INSERT ... SELECT from the stage, quantizing the staged float32 vectors as needed."""
+    vectors = storage_expressions(storage, "embedding")
+    return f"""
+    INSERT INTO code_embeddings ({", ".join(MERGE_PASSTHROUGH + list(vectors))})
+    SELECT {", ".join(MERGE_PASSTHROUGH + list(vectors.values()))} FROM {STAGE_TABLE}
+    ON CONFLICT (repo_id, file_path, chunk_index) DO UPDATE SET
+        content = EXCLUDED.content,
+        chunk_hash = EXCLUDED.chunk_hash,
+        embedding = EXCLUDED.embedding,
+        embedding_half = EXCLUDED.embedding_half,
+        embedding_bits = EXCLUDED.embedding_bits,
+        language = EXCLUDED.language,
+        start_line = EXCLUDED.start_line,
+        end_line = EXCLUDED.end_line
+"""
+
+
+# asyncpg connections that already have the binary vector codec installed
+_binary_codec_conns: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _encode_vector(value: Any) -> bytes:
+    # SQLAlchemy's Vector type binds text literals; accept those as well as arrays
+    if isinstance(value, str):
+        value = Vector.from_text(value)
+    elif not isinstance(value, Vector):
+        value = Vector(value)
+    return value.to_binary()
+
+
+async def _ensure_binary_vector_codec(driver):
+    """Binary COPY needs a binary vector codec on the raw asyncpg connection."""
+    if driver in _binary_codec_conns:
+        return
+    await driver.set_type_codec(
+        "vector",
+        encoder=_encode_vector,
+        decoder=Vector.from_binary,
+        format="binary"
+    )
+    _binary_codec_conns.add(driver)
+
+
+class EmbeddingWriter:
+    """
+    Writes a batch of chunk embeddings in a fixed number of round-trips.
+
+    "copy" mode streams the batch into a session-local staging table with
+    binary COPY (vectors in pgvector's binary format instead of text
+    literals) and merges it with a single INSERT ... ON CONFLICT.
+    "upsert" mode sends one multi-row INSERT ... ON CONFLICT statement.
+    Vectors are written in the layout of the embedding storage mode.
+    The caller owns the transaction.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        mode: str = settings.INDEX_WRITE_MODE,
+        storage: str = settings.EMBEDDING_STORAGE,
+    ):
+        if mode not in ("copy", "upsert"):
+            raise ValueError(f"Unknown index write mode: {mode}")
+        validate_storage(storage)
+        self.db = db
+        self.mode = mode
+        self.storage = storage
+        self._merge_stage = merge_stage_sql(storage)
+
+    async def write(self, repo_id: UUID, chunks: list[Chunk], embeddings: list[Any]):
+        if not chunks:
+            return
+        if self.mode == "copy":
+            await self._copy_merge(repo_id, chunks, embeddings)
+        else:
+            await self._upsert(repo_id, chunks, embeddings)
+
+    async def _upsert(self, repo_id: UUID, chunks: list[Chunk], embeddings: list[Any]):
+        stmt = insert(CodeEmbedding).values([
+            {
+                "repo_id": repo_id,
+                "file_path": chunk.file_path,
+                "chunk_index": chunk.index,
+                "chunk_hash": chunk.chunk_hash,
+                "content": chunk.content,
+                **storage_values(self.storage, embedding),
+                "language": chunk.language,
+                "start_line": chunk.start_line,
+                "end_line": chunk.end_line,
+            }
+            for chunk, embedding in zip(chunks, embeddings)
+        ])
+        # On conflict (same file+index), update content/hash/embedding
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_code_embeddings_repo_file_chunk",
+            set_={
+                'content': stmt.excluded.content,
+                'chunk_hash': stmt.excluded.chunk_hash,
+                **{column: stmt.excluded[column] for column in VECTOR_COLUMNS},
+                'language': stmt.excluded.language,
+                'start_line': stmt.excluded.start_line,
+                'end_line': stmt.excluded.end_line
+            }
+        )
+        await self.db.execute(stmt)
+
+    async def _copy_merge(self, repo_id: UUID, chunks: list[Chunk], embeddings: list[Any]):
+        # Goes through the session so SQLAlchemy sends BEGIN: raw asyncpg calls outside a
+        # transaction autocommit, and ON COMMIT DELETE ROWS would empty the stage before the merge
+        await self.db.execute(text(CREATE_STAGE))
+        conn = await self.db.connection()
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection  # asyncpg.Connection
+
+        records = [
+            (
+                uuid.uuid4(), repo_id, chunk.file_path, chunk.index, chunk.chunk_hash,
+                chunk.content, embedding, chunk.language, chunk.start_line, chunk.end_line,
+            )
+            for chunk, embedding in zip(chunks, embeddings)
+        ]
+
+        await _ensure_binary_vector_codec(driver)
+        await driver.copy_records_to_table(STAGE_TABLE, records=records, columns=STAGE_COLUMNS)
+        status = await driver.execute(self._merge_stage)
+        await driver.execute(f"TRUNCATE {STAGE_TABLE}")
+        # Status is "INSERT 0 <rows>"; upserted rows count too
+        merged = int(status.split()[-1])
+        if merged != len(records):
+            raise RuntimeError(f"Merged {merged} of {len(records)} staged embeddings")
@@ -1,5 +1,25 @@
 from dataclasses import dataclass
 import hashlib
+import re
+import zlib
+
+# Every separator str.splitlines() honours besides "\n"
+# (substring checks are memchr-fast; a regex character class is not)
+_OTHER_LINE_BREAKS = ("\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+_ASCII_LINE_BREAKS = _OTHER_LINE_BREAKS[:6]
+
+
+def _has_other_line_breaks(content: str) -> bool:
+    # isascii() is O(1) on str, and lets pure-ASCII files skip the three non-ASCII scans
+    for sep in _ASCII_LINE_BREAKS if content.isascii() else _OTHER_LINE_BREAKS:
+        if sep in content:
+            return True
+    return False
+
+# Lines that start a new top-level definition; content-defined cuts snap to these
+TOP_LEVEL_DEF = re.compile(
+    r"^(?:async def|def|class|func|fn|pub fn|function|export|interface|type|struct|impl|enum)\b"
+)
 
 @dataclass
 class Chunk:
@@ -14,76 +34,188 @@ class Chunk:
 class ChunkingService:
     """Service to split source code into meaningful chunks."""
     
-    def __init__(self, chunk_size: int = 2000, chunk_overlap: int = 200):
+    # Content-defined chunking parameters
+    CDC_WINDOW_LINES = 3     # lines covered by the rolling hash
+    CDC_SNAP_LINES = 8       # how far past a hash boundary to look for a syntactic break
+    CDC_ASSUMED_LINE_LEN = 40  # fixed so boundary odds never depend on the rest of the file
+    
+    def __init__(self, chunk_size: int = 2000, chunk_overlap: int = 200, mode: str = "fixed"):
+        if mode not in ("fixed", "cdc"):
+            raise ValueError(f"Unknown chunking mode: {mode}")
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.mode = mode
 
     def chunk_file(self, file_path: str, content: str) -> list[Chunk]:
         """
         Splits file content into chunks. 
-        For now, implementing a simple character/line-based splitting.
+        "fixed" mode cuts at a character budget with overlap; "cdc" mode picks
+        content-defined boundaries (see _chunk_content_defined).
         Future: Use tree-sitter or language-specific parsers.
         """
-        lines = content.splitlines()
+        if self.mode == "cdc":
+            return self._chunk_content_defined(file_path, content)
+        
+        return self._chunk_fixed(file_path, content)
+
+    def _chunk_fixed(self, file_path: str, content: str) -> list[Chunk]:
+        """
+        Character-budget chunking with line overlap.
+        Works directly on offsets into the original string: chunk ends are
+        found with rfind over the budget window, overlap starts with find, line
+        numbers with count, and each chunk is a single slice. Python-level work
+        is per chunk, not per line, and no search runs past the budget window
+        except to find the end of a line longer than it. Output matches
+        splitting on str.splitlines() and re-joining with "\n".
+        """
+        # `end` is where the last line stops: a trailing newline terminates the
+        # last line rather than starting an empty one (as with splitlines()).
+        if _has_other_line_breaks(content):
+            # Rare: \r\n, \r or other separators; splitlines() semantics normalise them to \n
+            lines = content.splitlines()
+            if not lines:
+                return []
+            content = "\n".join(lines)
+            end = len(content)
+        else:
+            if not content:
+                return []
+            end = len(content) - 1 if content.endswith("\n") else len(content)
+        
+        def line_end(pos: int) -> int:
+            # Offset of the newline (or `end`) terminating the line starting at pos
+            nl = content.find("\n", pos, end)
+            return end if nl == -1 else nl
+        
+        language = self._get_language(file_path)
         chunks = []
-        current_chunk_lines = []
-        current_size = 0
+        start = 0                   # offset of the current chunk's first line
         start_line = 1
-        chunk_idx = 0
+        # The chunk always takes at least the line that triggered the previous cut
+        # (initially the first line), even if that alone exceeds the budget.
+        # That line spans [must_from, min_end) and has no newline inside, so line
+        # counts never scan it (it may be far longer than chunk_size).
+        must_from = 0
+        min_end = line_end(0)
         
-        language = self._get_language(file_path)
-
-        for i, line in enumerate(lines):
-            line_len = len(line) + 1 # +1 for newline
-            
-            if current_size + line_len > self.chunk_size and current_chunk_lines:
-                # Flush current chunk
-                chunk_text = "\n".join(current_chunk_lines)
-                end_line = start_line + len(current_chunk_lines) - 1
-                
-                chunks.append(Chunk(
-                    content=chunk_text,
-                    file_path=file_path,
-                    index=chunk_idx,
-                    start_line=start_line,
-                    end_line=end_line,
-                    language=language,
-                    chunk_hash=self._hash_text(chunk_text)
-                ))
-                
-                # Start new chunk with overlap
-                # Simple logic: keep last N lines that fit inside overlap size
-                overlap_lines = []
-                overlap_size = 0
-                for l in reversed(current_chunk_lines):
-                    if overlap_size + len(l) + 1 <= self.chunk_overlap:
-                        overlap_lines.insert(0, l)
-                        overlap_size += len(l) + 1
-                    else:
-                        break
-                
-                current_chunk_lines = overlap_lines
-                current_size = overlap_size
-                start_line = (i + 1) - len(current_chunk_lines) + 1
-                chunk_idx += 1
+        while True:
+            # A line fits if its newline lands within chunk_size chars of the chunk start
+            limit = start + self.chunk_size - 1
+            if end <= limit or min_end >= end:
+                break
+            cut = content.rfind("\n", min_end, limit + 1)
+            if cut == -1:
+                cut = min_end
             
-            current_chunk_lines.append(line)
-            current_size += line_len
+            chunk_text = content[start:cut]
+            end_line = start_line + content.count("\n", start, must_from) + content.count("\n", min_end, cut)
+            chunks.append(Chunk(
+                content=chunk_text,
+                file_path=file_path,
+                index=len(chunks),
+                start_line=start_line,
+                end_line=end_line,
+                language=language,
+                chunk_hash=self._hash_text(chunk_text)
+            ))
             
+            # Overlap: the longest run of trailing lines whose size fits chunk_overlap
+            next_line = cut + 1
+            overlap_from = next_line - self.chunk_overlap
+            if overlap_from > start:
+                overlap_start = content.find("\n", overlap_from - 1, next_line) + 1
+                # Lines after the cut, minus the (short) overlap carried back
+                start_line = end_line + 1 - content.count("\n", overlap_start, next_line)
+                start = overlap_start
+            must_from = next_line
+            min_end = line_end(next_line)
+        
         # Flush last chunk
-        if current_chunk_lines:
-            chunk_text = "\n".join(current_chunk_lines)
-            end_line = start_line + len(current_chunk_lines) - 1
+        chunk_text = content[start:end]
+        chunks.append(Chunk(
+            content=chunk_text,
+            file_path=file_path,
+            index=len(chunks),
+            start_line=start_line,
+            end_line=start_line + content.count("\n", start, must_from) + content.count("\n", min_end, end),
+            language=language,
+            chunk_hash=self._hash_text(chunk_text)
+        ))
+        
+        return chunks
+
+    def _chunk_content_defined(self, file_path: str, content: str) -> list[Chunk]:
+        """
+        Content-defined chunking over lines.
+        A rolling hash over the last few lines proposes a boundary; the cut is
+        then snapped to the next blank line or top-level definition. Since a
+        boundary depends only on nearby lines, inserting or deleting lines
+        only changes the chunks around the edit, and chunk hashes further down
+        the file stay the same. Chunks never exceed chunk_size (except for a
+        single oversized line) and don't overlap, because overlap would tie
+        each chunk's hash to its neighbour's content.
+        """
+        lines = content.splitlines()
+        language = self._get_language(file_path)
+        min_size = self.chunk_size // 4
+        # Expected chunk size is about min_size + divisor lines
+        divisor = max(2, (self.chunk_size - 2 * min_size) // (2 * self.CDC_ASSUMED_LINE_LEN))
+        
+        chunks = []
+        current_lines: list[str] = []
+        current_size = 0
+        start_line = 1
+        window: list[int] = []
+        lines_since_boundary = -1  # -1: no boundary proposed yet
+        
+        def flush(next_start: int):
+            nonlocal current_lines, current_size, start_line, lines_since_boundary
+            chunk_text = "\n".join(current_lines)
             chunks.append(Chunk(
                 content=chunk_text,
                 file_path=file_path,
-                index=chunk_idx,
+                index=len(chunks),
                 start_line=start_line,
-                end_line=end_line,
+                end_line=start_line + len(current_lines) - 1,
                 language=language,
                 chunk_hash=self._hash_text(chunk_text)
             ))
+            current_lines = []
+            current_size = 0
+            start_line = next_start
+            lines_since_boundary = -1
+        
+        for i, line in enumerate(lines):
+            line_no = i + 1
+            line_len = len(line) + 1
             
+            if current_lines:
+                if current_size + line_len > self.chunk_size:
+                    # Hard cap
+                    flush(line_no)
+                elif lines_since_boundary >= 0 and TOP_LEVEL_DEF.match(line):
+                    # Snap: cut right before a new top-level definition
+                    flush(line_no)
+            
+            current_lines.append(line)
+            current_size += line_len
+            
+            window.append(zlib.crc32(line.encode("utf-8", "surrogatepass")))
+            if len(window) > self.CDC_WINDOW_LINES:
+                window.pop(0)
+            
+            if lines_since_boundary >= 0:
+                lines_since_boundary += 1
+                if not line.strip() or lines_since_boundary >= self.CDC_SNAP_LINES:
+                    # Snap: cut after a blank line, or give up looking
+                    flush(line_no + 1)
+                    continue
+            elif current_size >= min_size and sum(window) % divisor == 0:
+                lines_since_boundary = 0
+        
+        if current_lines:
+            flush(len(lines) + 1)
+        
         return chunks
 
     def _get_language(self, file_path: str) -> str:
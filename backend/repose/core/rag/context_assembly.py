@@ -0,0 +1,117 @@
+from dataclasses import dataclass, field
+from typing import Iterable
+from uuid import UUID
+
+from repose.core.llm.embedding_executor import estimate_tokens
+from repose.core.rag.retrieval import RetrievedChunk
+
+# Keeps spans with a zero/negative score rankable
+MIN_RELEVANCE = 1e-6
+
+
+@dataclass
+class ContextSpan:
+    """A contiguous run of lines from one file, built from one or more retrieved chunks."""
+    file_path: str
+    start_line: int
+    end_line: int
+    lines: list[str]
+    relevance: float
+    # Best retrieval rank among the span's chunks (0 = top hit); orders the prompt
+    best_rank: int
+    chunk_ids: list[UUID] = field(default_factory=list)
+
+    @property
+    def header(self) -> str:
+        return f"File: {self.file_path} (Lines {self.start_line}-{self.end_line}):\n"
+
+    def render(self) -> str:
+        return self.header + "\n".join(self.lines)
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.render())
+
+
+def _span_from_chunk(chunk: RetrievedChunk, rank: int) -> ContextSpan:
+    lines = chunk.content.split("\n")
+    start = chunk.start_line or 1
+    return ContextSpan(
+        file_path=chunk.file_path,
+        start_line=start,
+        end_line=start + len(lines) - 1,
+        lines=lines,
+        relevance=max(chunk.score, MIN_RELEVANCE),
+        best_rank=rank,
+        chunk_ids=[chunk.id],
+    )
+
+
+def merge_chunks(chunks: Iterable[RetrievedChunk]) -> list[ContextSpan]:
+    """
+    Merges overlapping or adjacent chunks of the same file into single spans.
+    Overlapping lines appear once; a merged span's relevance is the sum of
+    its chunks' scores.
+    """
+    by_file: dict[str, list[ContextSpan]] = {}
+    merged: list[ContextSpan] = []
+    for rank, chunk in enumerate(chunks):
+        span = _span_from_chunk(chunk, rank)
+        if chunk.end_line is not None and chunk.end_line != span.end_line:
+            # Line numbers don't match the content; can't line up overlaps safely
+            merged.append(span)
+        else:
+            by_file.setdefault(chunk.file_path, []).append(span)
+
+    for spans in by_file.values():
+        spans.sort(key=lambda s: s.start_line)
+        current = spans[0]
+        for span in spans[1:]:
+            if span.start_line > current.end_line + 1:
+                merged.append(current)
+                current = span
+                continue
+            if span.end_line > current.end_line:
+                # Append only the lines past the current span's end
+                current.lines.extend(span.lines[current.end_line - span.start_line + 1:])
+                current.end_line = span.end_line
+            current.relevance += span.relevance
+            current.best_rank = min(current.best_rank, span.best_rank)
+            current.chunk_ids.extend(span.chunk_ids)
+        merged.append(current)
+    return merged
+
+
+def _truncate(span: ContextSpan, budget: int) -> ContextSpan:
+    # Drop trailing lines until the span fits (keeps at least the first line)
+    while len(span.lines) > 1 and span.tokens > budget:
+        keep = max(1, len(span.lines) * budget // max(span.tokens, 1))
+        span.lines = span.lines[:min(keep, len(span.lines) - 1)]
+        span.end_line = span.start_line + len(span.lines) - 1
+    return span
+
+
+def assemble_context(chunks: list[RetrievedChunk], token_budget: int) -> list[ContextSpan]:
+    """
+    Picks the spans to put in the prompt.
+    Spans are chosen greedily by relevance per token until the budget is
+    full, then returned in retrieval order (best hit first). If even the
+    best span alone is too big, it is truncated rather than dropped.
+    """
+    spans = merge_chunks(chunks)
+    if not spans:
+        return []
+
+    chosen: list[ContextSpan] = []
+    used = 0
+    for span in sorted(spans, key=lambda s: s.relevance / s.tokens, reverse=True):
+        if used + span.tokens <= token_budget:
+            chosen.append(span)
+            used += span.tokens
+
+    if not chosen:
+        best = min(spans, key=lambda s: s.best_rank)
+        chosen.append(_truncate(best, token_budget))
+
+    chosen.sort(key=lambda s: s.best_rank)
+    return chosen
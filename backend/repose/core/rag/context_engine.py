@@ -1,12 +1,25 @@
+import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-from sqlalchemy.dialects.postgresql import insert
-import os
+from sqlalchemy import delete, bindparam, any_, all_, String
+from sqlalchemy.dialects.postgresql import ARRAY
+from typing import Optional
 from uuid import UUID
 
+from repose.core.config import settings
 from repose.core.llm import LLMClient, Message
+from repose.integrations import git
+from repose.core.rag.answer_cache import AnswerCache
 from repose.core.rag.chunking import ChunkingService
+from repose.core.rag.context_assembly import assemble_context
+from repose.core.rag.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from repose.core.rag import local_index
+from repose.core.rag.lexical import LexicalRetriever, route_query, is_confident, reciprocal_rank_fusion
+from repose.core.rag.pipeline import IndexingPipeline, IndexStats
+from repose.core.rag.retrieval import RetrievedChunk, VectorRetriever
+from repose.core.rag.storage import convert_storage
+from repose.core.rag.walker import RepositoryWalker
 from repose.models.embedding import CodeEmbedding
+from repose.models.repository import Repository
 
 class ContextEngine:
     """RAG engine for repository context."""
@@ -14,109 +27,167 @@ class ContextEngine:
     def __init__(self, db: AsyncSession, llm_client: LLMClient):
         self.db = db
         self.llm = llm_client
-        self.chunker = ChunkingService()
+        self.chunker = ChunkingService(mode=settings.CHUNKING_MODE)
+        self.embedding_cache = EmbeddingCache(db, model=llm_client.embed_model)
+        self.query_cache = QueryEmbeddingCache(model=llm_client.embed_model)
+        self.pipeline = IndexingPipeline(db, llm_client, self.chunker, self.embedding_cache)
+        self.retriever = VectorRetriever(db)
+        self.lexical = LexicalRetriever(db)
     
-    async def index_repository(self, repo_id: UUID, repo_path: str):
+    async def index_repository(self, repo_id: UUID, repo_path: str, exclude: Optional[list[str]] = None) -> IndexStats:
         """
         Indexes a repository by walking files, chunking, and embedding.
         Assumes repo_path is a local path where repo is cloned.
+        exclude holds extra gitignore-style patterns on top of the repo's .gitignore files.
         """
-        # 1. Walk directory and collect files
-        files_to_process = []
-        for root, _, files in os.walk(repo_path):
-            if ".git" in root:
-                continue
-            for file in files:
-                # Basic filter for now
-                if file.endswith(('.py', '.js', '.ts', '.tsx', '.md', '.go', '.rs')):
-                    files_to_process.append(os.path.join(root, file))
+        # 1. Walk, chunk, embed and store as a streaming pipeline
+        walker = RepositoryWalker(repo_path, exclude=exclude)
+        stats = await self.pipeline.run(repo_id, repo_path, walker.walk())
+        print(f"Indexed {stats.files} files ({stats.chunks} chunks) for repo {repo_id}; walk: {walker.stats.summary()}")
         
-        # 2. Process files
-        all_chunks = []
-        for file_path in files_to_process:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                rel_path = os.path.relpath(file_path, repo_path)
-                chunks = self.chunker.chunk_file(rel_path, content)
-                all_chunks.extend(chunks)
-            except Exception as e:
-                print(f"Error processing file {file_path}: {e}")
-                continue
-                
-        if not all_chunks:
-            return
+        # 2. Drop rows for files that no longer exist in the tree
+        stmt = delete(CodeEmbedding).filter(
+            CodeEmbedding.repo_id == repo_id,
+            CodeEmbedding.file_path != all_(bindparam("paths", stats.seen_paths, type_=ARRAY(String)))
+        )
+        await self.db.execute(stmt)
+        await self.db.commit()
+        return stats
+
+    async def sync_repository_index(self, repo: Repository, repo_path: str) -> str:
+        """
+        Incrementally re-indexes a repository clone.
+        Diffs repo.last_commit_sha against the clone's HEAD and only re-chunks
+        added/modified files; falls back to a full index when there is no
+        usable base commit. Advances repo.last_commit_sha to HEAD unless some
+        files or batches failed (so the next sync retries them from the same
+        base), and returns the commit the index is now at.
+        """
+        head_sha = await git.get_head_sha(repo_path)
+        base_sha = repo.last_commit_sha
+        exclude = (repo.settings or {}).get("index_exclude")
+        
+        # Rows written under a previous EMBEDDING_STORAGE are re-laid out in place
+        converted = await convert_storage(self.db, repo.id, settings.EMBEDDING_STORAGE)
+        if converted:
+            print(f"Converted {converted} embeddings to {settings.EMBEDDING_STORAGE} storage for repo {repo.id}")
+            await self.db.commit()
+        
+        if base_sha == head_sha:
+            return head_sha
+        
+        if base_sha and await git.commit_exists(repo_path, base_sha):
+            changes = await git.diff_files(repo_path, base_sha, head_sha)
+            walker = RepositoryWalker(repo_path, exclude=exclude)
+            changed = list(walker.filter_paths(changes.changed))
             
-        # 3. Generate embeddings (Batching)
-        batch_size = 50
-        for i in range(0, len(all_chunks), batch_size):
-            batch = all_chunks[i:i + batch_size]
-            texts = [c.content for c in batch]
+            # Files that are now ignored/binary/generated lose their rows too
+            indexable = set(changed)
+            removed = changes.deleted + [p for p in changes.changed if p not in indexable]
+            if removed:
+                stmt = delete(CodeEmbedding).filter(
+                    CodeEmbedding.repo_id == repo.id,
+                    CodeEmbedding.file_path == any_(bindparam("paths", removed, type_=ARRAY(String)))
+                )
+                await self.db.execute(stmt)
             
-            try:
-                embeddings = await self.llm.generate_embeddings(texts)
-                
-                # 4. Store in DB
-                for chunk, embedding in zip(batch, embeddings):
-                    stmt = insert(CodeEmbedding).values(
-                        repo_id=repo_id,
-                        file_path=chunk.file_path,
-                        chunk_index=chunk.index,
-                        chunk_hash=chunk.chunk_hash,
-                        content=chunk.content,
-                        embedding=embedding,
-                        language=chunk.language,
-                        start_line=chunk.start_line,
-                        end_line=chunk.end_line
-                    )
-                    # On conflict (same file+index), update content/hash/embedding
-                    stmt = stmt.on_conflict_do_update(
-                        index_elements=['repo_id', 'file_path', 'chunk_index'],
-                        set_={
-                            'content': stmt.excluded.content,
-                            'chunk_hash': stmt.excluded.chunk_hash,
-                            'embedding': stmt.excluded.embedding,
-                            'start_line': stmt.excluded.start_line,
-                            'end_line': stmt.excluded.end_line
-                        }
-                    )
-                    await self.db.execute(stmt)
-                    
-                await self.db.commit()
-                
-            except Exception as e:
-                print(f"Error generating embeddings for batch: {e}")
-                await self.db.rollback()
+            stats = await self.pipeline.run(repo.id, repo_path, changed)
+        else:
+            # First index, or history was rewritten (force push) so the old SHA is gone
+            stats = await self.index_repository(repo.id, repo_path, exclude=exclude)
+        
+        if stats.failed_files or stats.failed_batches:
+            print(
+                f"Not advancing repo {repo.id} past {base_sha}: {stats.failed_files} files and "
+                f"{stats.failed_batches} batches failed"
+            )
+        else:
+            repo.last_commit_sha = head_sha
+        await self.db.commit()
+        # Cached answers were built from chunks that may have just changed
+        await AnswerCache.invalidate_repo(repo.id)
+        return repo.last_commit_sha
 
-    async def retrieve_similar(self, repo_id: UUID, query: str, top_k: int = 5) -> list[CodeEmbedding]:
-        """Find most relevant code chunks for a query."""
-        query_embedding = await self.llm.generate_embedding(query)
+    async def retrieve_similar(
+        self,
+        repo_id: UUID,
+        query: str,
+        top_k: int = 5,
+        search_mode: Optional[str] = None,
+        ef_search: Optional[int] = None
+    ) -> list[RetrievedChunk]:
+        """
+        Find most relevant code chunks for a query.
+        With RETRIEVAL_BACKEND="local", repos that have a memory-mapped index are
+        searched in-process; the rest go to pgvector and get a build queued.
+        """
+        query_embedding = await self.query_cache.embed(self.llm, query)
+        return await self._search_embedding(repo_id, query_embedding, top_k, search_mode, ef_search)
+
+    async def _search_embedding(
+        self,
+        repo_id: UUID,
+        query_embedding: list[float],
+        top_k: int,
+        search_mode: Optional[str] = None,
+        ef_search: Optional[int] = None
+    ) -> list[RetrievedChunk]:
+        if settings.RETRIEVAL_BACKEND == "local":
+            # Stale or missing indexes (built in the background for hot repos) use pgvector
+            index = await local_index.lookup(repo_id)
+            if index is not None:
+                # numpy releases the GIL for the matmul
+                return await asyncio.to_thread(index.search, query_embedding, top_k)
+        
+        return await self.retriever.search(repo_id, query_embedding, top_k, search_mode, ef_search)
+
+    async def retrieve(self, repo_id: UUID, query: str, top_k: int = 5) -> list[RetrievedChunk]:
+        """
+        Routed retrieval for chat.
+        Identifier-like or quoted queries are answered by lexical search alone
+        when it finds a definition or a chunk with every term; no embedding
+        call is made. Everything else (and unconfident lexical lookups) runs
+        lexical and vector search and fuses them with reciprocal rank fusion.
+        """
+        if not settings.RETRIEVAL_ROUTING:
+            return await self.retrieve_similar(repo_id, query, top_k)
         
-        # Using PGVector's cosine distance (smaller is better)
-        stmt = select(CodeEmbedding).filter(
-            CodeEmbedding.repo_id == repo_id
-        ).order_by(
-            CodeEmbedding.embedding.cosine_distance(query_embedding)
-        ).limit(top_k)
+        candidates = max(top_k, settings.RETRIEVAL_LEXICAL_CANDIDATES)
+        route = route_query(query)
+        term_hits = []
+        if route.mode == "lexical":
+            term_hits = await self.lexical.search_terms(repo_id, route.terms, candidates)
+            if is_confident(term_hits, route.terms):
+                return [hit.chunk for hit in term_hits[:top_k]]
         
-        result = await self.db.execute(stmt)
-        return result.scalars().all()
+        # The lexical query overlaps the embedding round-trip
+        if term_hits:
+            lexical_chunks = [hit.chunk for hit in term_hits]
+            query_embedding = await self.query_cache.embed(self.llm, query)
+        else:
+            lexical_chunks, query_embedding = await asyncio.gather(
+                self.lexical.search_text(repo_id, query, candidates),
+                self.query_cache.embed(self.llm, query)
+            )
+        vector_chunks = await self._search_embedding(repo_id, query_embedding, candidates)
+        return reciprocal_rank_fusion(
+            [vector_chunks, lexical_chunks], k=settings.RETRIEVAL_RRF_K, limit=top_k
+        )
 
     async def query(self, repo_id: UUID, question: str) -> any:
         """
         End-to-end RAG query: 
         1. Retrieve context
-        2. Construct prompt
-        3. Stream answer from LLM
+        2. Merge overlapping chunks into spans that fit the context token budget
+        3. Construct prompt
+        4. Stream answer from LLM
+        Returns the stream and the spans used as sources.
         """
         
-        context_chunks = await self.retrieve_similar(repo_id, question, top_k=5)
+        context_chunks = await self.retrieve(repo_id, question, top_k=settings.RETRIEVAL_CONTEXT_CANDIDATES)
+        spans = assemble_context(context_chunks, self.llm.config.context_token_budget)
         
-        context_str = "\n\n".join([
-            f"File: {c.file_path} (Lines {c.start_line}-{c.end_line}):\n{c.content}"
-            for c in context_chunks
-        ])
+        context_str = "\n\n".join(span.render() for span in spans)
         
         system_prompt = """You are an expert software engineer assisting with a codebase.
 Use the provided Context to answer the user's question. 
@@ -137,4 +208,4 @@ Question:
         ]
         
         # We return the generator to be streamed by the API
-        return self.llm.stream_complete(messages), context_chunks
+        return self.llm.stream_complete(messages), spans
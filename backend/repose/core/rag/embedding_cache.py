@@ -0,0 +1,267 @@
+import asyncio
+import hashlib
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Any, Hashable, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repose.core.config import settings
+from repose.core.llm import LLMClient
+from repose.core.llm.base import CODE_EMBED_DIM
+from repose.core.redis import get_redis
+from repose.core.rag.chunking import Chunk
+from repose.models.embedding_cache import EmbeddingCacheEntry
+
+
+class LRUCache:
+    """Minimal size-capped LRU mapping (not thread-safe, one per process)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache.
+    Lookups go to a process-wide LRU first, then to the embedding_cache table.
+    Only hashes that miss both are sent to the embedding API.
+    """
+
+    # Shared by every ContextEngine in the process; float32 keeps entries ~6KB
+    _memory = LRUCache(settings.EMBEDDING_CACHE_MEMORY_SIZE)
+
+    def __init__(self, db: AsyncSession, model: str, dimensions: int = CODE_EMBED_DIM):
+        self.db = db
+        self.model = model
+        self.dimensions = dimensions
+
+    def _key(self, chunk_hash: str) -> tuple:
+        return (self.model, self.dimensions, chunk_hash)
+
+    async def get_many(self, hashes: list[str]) -> dict[str, np.ndarray]:
+        found = {}
+        missing = []
+        for h in set(hashes):
+            value = self._memory.get(self._key(h))
+            if value is not None:
+                found[h] = value
+            else:
+                missing.append(h)
+
+        if missing:
+            stmt = select(EmbeddingCacheEntry.chunk_hash, EmbeddingCacheEntry.embedding).filter(
+                EmbeddingCacheEntry.model == self.model,
+                EmbeddingCacheEntry.dimensions == self.dimensions,
+                EmbeddingCacheEntry.chunk_hash.in_(missing)
+            )
+            result = await self.db.execute(stmt)
+            for chunk_hash, embedding in result.all():
+                vector = np.asarray(embedding, dtype=np.float32)
+                self._memory.put(self._key(chunk_hash), vector)
+                found[chunk_hash] = vector
+
+        return found
+
+    async def put_many(self, items: dict[str, Any]):
+        """Stores new embeddings. The caller owns the transaction."""
+        if not items:
+            return
+        rows = []
+        for chunk_hash, embedding in items.items():
+            vector = np.asarray(embedding, dtype=np.float32)
+            self._memory.put(self._key(chunk_hash), vector)
+            rows.append({
+                "model": self.model,
+                "dimensions": self.dimensions,
+                "chunk_hash": chunk_hash,
+                "embedding": vector,
+            })
+        stmt = insert(EmbeddingCacheEntry).values(rows).on_conflict_do_nothing()
+        await self.db.execute(stmt)
+
+    async def embed_chunks(
+        self,
+        llm: LLMClient,
+        chunks: list[Chunk],
+        db_lock: Optional[asyncio.Lock] = None
+    ) -> list[np.ndarray]:
+        """
+        Returns one embedding per chunk (in order), calling the LLM only for
+        chunk hashes that have never been embedded with this model before.
+        db_lock serialises session access when other coroutines share self.db.
+        """
+        lock = db_lock or nullcontext()
+        async with lock:
+            cached = await self.get_many([c.chunk_hash for c in chunks])
+
+        # Dedupe misses so repeated content inside a batch is embedded once
+        to_embed: dict[str, str] = {}
+        for c in chunks:
+            if c.chunk_hash not in cached and c.chunk_hash not in to_embed:
+                to_embed[c.chunk_hash] = c.content
+
+        if to_embed:
+            embeddings = await llm.generate_embeddings(list(to_embed.values()))
+            fresh = dict(zip(to_embed.keys(), embeddings))
+            async with lock:
+                await self.put_many(fresh)
+            cached.update({h: np.asarray(e, dtype=np.float32) for h, e in fresh.items()})
+
+        return [cached[c.chunk_hash] for c in chunks]
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache for query (question) embeddings.
+    A process-wide LRU is checked first, then Redis, which is shared by every
+    worker. Entries are keyed on normalised text + model + dimensions, expire
+    after a TTL, and the Redis tier is capped with oldest-first eviction.
+    Hits skip the embedding API entirely; Redis errors count as misses.
+    """
+
+    KEY_PREFIX = "repose:query_embedding:"
+    INDEX_KEY = "repose:query_embedding:index"  # zset of key -> last write time
+    STATS_KEY = "repose:query_embedding:stats"  # hash of hit/miss counters (all workers)
+
+    _memory = LRUCache(settings.QUERY_EMBEDDING_CACHE_MEMORY_SIZE)
+    # Counters for this process; STATS_KEY has the totals
+    stats = {"memory_hits": 0, "redis_hits": 0, "misses": 0}
+    # Counts not yet added to STATS_KEY; flushed at most every STATS_FLUSH_SECONDS (and on
+    # misses, which make network calls anyway) so memory hits stay off the network
+    STATS_FLUSH_SECONDS = 10.0
+    _unflushed = {"memory_hits": 0, "redis_hits": 0, "misses": 0}
+    _last_flush = 0.0
+
+    def __init__(
+        self,
+        model: str,
+        dimensions: int = CODE_EMBED_DIM,
+        enabled: bool = settings.QUERY_EMBEDDING_CACHE_ENABLED,
+        ttl_seconds: int = settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+        max_entries: int = settings.QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+    ):
+        self.model = model
+        self.dimensions = dimensions
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    @staticmethod
+    def normalise(text: str) -> str:
+        # Unicode-normalise and collapse whitespace; case is kept since identifiers care
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def _key(self, text: str) -> str:
+        digest = hashlib.sha256(f"{self.model}\0{self.dimensions}\0{self.normalise(text)}".encode("utf-8"))
+        return self.KEY_PREFIX + digest.hexdigest()
+
+    async def embed(self, llm: LLMClient, text: str) -> np.ndarray:
+        if not self.enabled:
+            return np.asarray(await llm.generate_embedding(text), dtype=np.float32)
+
+        key = self._key(text)
+        vector = self._memory.get(key)
+        if vector is not None:
+            await self._count("memory_hits")
+            return vector
+
+        vector = await self._redis_get(key)
+        if vector is not None:
+            self._memory.put(key, vector)
+            await self._count("redis_hits")
+            return vector
+
+        await self._count("misses")
+        vector = np.asarray(await llm.generate_embedding(text), dtype=np.float32)
+        self._memory.put(key, vector)
+        await self._redis_put(key, vector)
+        return vector
+
+    async def _redis_get(self, key: str) -> Optional[np.ndarray]:
+        try:
+            data = await get_redis(decode_responses=False).get(key)
+        except Exception as e:
+            print(f"Error reading query embedding cache: {e}")
+            return None
+        if data is None or len(data) != self.dimensions * 4:
+            return None
+        return np.frombuffer(data, dtype=np.float32)
+
+    async def _redis_put(self, key: str, vector: np.ndarray):
+        now = time.time()
+        try:
+            redis = get_redis(decode_responses=False)
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.set(key, vector.astype(np.float32).tobytes(), ex=self.ttl_seconds)
+                pipe.zadd(self.INDEX_KEY, {key: now})
+                # Forget index entries whose keys have expired on their own
+                pipe.zremrangebyscore(self.INDEX_KEY, "-inf", now - self.ttl_seconds)
+                pipe.zcard(self.INDEX_KEY)
+                *_, size = await pipe.execute()
+
+            if size > self.max_entries:
+                evicted = await redis.zpopmin(self.INDEX_KEY, size - self.max_entries)
+                if evicted:
+                    await redis.delete(*(member for member, _ in evicted))
+        except Exception as e:
+            print(f"Error writing query embedding cache: {e}")
+
+    async def _count(self, field: str):
+        cls = type(self)
+        cls.stats[field] += 1
+        cls._unflushed[field] += 1
+        if field == "misses" or time.monotonic() - cls._last_flush >= cls.STATS_FLUSH_SECONDS:
+            await cls._flush_stats()
+
+    @classmethod
+    async def _flush_stats(cls):
+        pending = {field: n for field, n in cls._unflushed.items() if n}
+        cls._last_flush = time.monotonic()
+        if not pending:
+            return
+        for field in pending:
+            cls._unflushed[field] = 0
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for field, n in pending.items():
+                    pipe.hincrby(cls.STATS_KEY, field, n)
+                await pipe.execute()
+        except Exception as e:
+            # Put them back for the next flush
+            for field, n in pending.items():
+                cls._unflushed[field] += n
+            print(f"Error updating query embedding cache stats: {e}")
+
+    @classmethod
+    async def shared_stats(cls) -> dict[str, int]:
+        """Hit/miss totals across all workers (this process's pending counts included)."""
+        await cls._flush_stats()
+        counts = await get_redis().hgetall(cls.STATS_KEY)
+        return {field: int(counts.get(field, 0)) for field in cls.stats}
@@ -0,0 +1,174 @@
+import re
+from dataclasses import dataclass, field, replace
+from typing import Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import select, case, or_, literal_column, bindparam, func, String
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repose.core.rag.retrieval import CHUNK_COLUMNS, RetrievedChunk, chunks_from_rows
+from repose.models.embedding import CodeEmbedding
+
+# Must match the expression index in migration 006 exactly (no bound parameter)
+TSVECTOR = func.to_tsvector(literal_column("'simple'"), CodeEmbedding.content)
+
+# Backticked, double- or single-quoted fragments. Quotes must sit at word edges,
+# so apostrophes ("the repo's ... the user's") don't pair up into a "quote"
+QUOTED = re.compile(r"`([^`\n]{3,})`|(?<!\w)\"([^\"\n]{3,})\"(?!\w)|(?<!\w)'([^'\n]{3,})'(?!\w)")
+TOKEN = re.compile(r"[A-Za-z_][\w.:]*(?:\(\))?")
+# snake_case, dotted.path (parts of 2+ chars, so not "e.g"), Type::member,
+# camelCase/PascalCase (a lower-to-upper hump after 2+ chars, so not "iOS"), or a call()
+CODE_SHAPED = re.compile(r"\w_\w|\w\w\.\w\w|::|[a-z]{2}[A-Z]|[A-Z][a-z]+[A-Z]|\(\)$")
+# Code-shaped words that are usually product names in questions, not symbols
+PRODUCT_NAMES = {
+    "node.js", "vue.js", "next.js", "nuxt.js", "react.js", "express.js", "three.js", "chart.js",
+    "asp.net", "vb.net", "ios", "ipados", "macos", "tvos", "watchos", "iphone", "ipad",
+    "github", "gitlab", "bitbucket", "javascript", "typescript", "coffeescript", "postgresql",
+    "mysql", "mongodb", "graphql", "openai", "oauth", "youtube", "linkedin", "powershell",
+    "webassembly", "devops", "fastapi", "pytorch", "tensorflow", "numpy", "pypi", "npm",
+    "sqlite", "redis", "jquery", "openapi", "websocket", "websockets", "dynamodb",
+}
+
+DEFINITION_KEYWORDS = r"(?:def|class|func|fn|function|interface|type|struct|enum|trait|const|let|var)"
+
+STOPWORDS = {
+    "the", "and", "for", "are", "how", "what", "where", "when", "which", "who", "why",
+    "does", "this", "that", "with", "from", "into", "there", "their", "code", "repo",
+    "can", "you", "use", "used", "using", "get", "find", "show", "defined", "work", "works",
+}
+
+@dataclass
+class QueryRoute:
+    # "lexical": exact term lookup first; "hybrid": lexical + vector fused with RRF
+    mode: str
+    terms: list[str] = field(default_factory=list)
+
+
+def route_query(query: str) -> QueryRoute:
+    """
+    Identifier-like and quoted queries ("where is `sync_repo_issues` defined",
+    a pasted error with quoted names) go to lexical search on their code
+    terms; anything else is natural language and goes hybrid.
+    """
+    quoted = [next(g for g in m.groups() if g) for m in QUOTED.finditer(query)]
+    if quoted:
+        return QueryRoute("lexical", [q.strip() for q in quoted])
+
+    code_terms = []
+    for token in TOKEN.findall(query):
+        name = token.removesuffix("()").rstrip(".:")
+        if CODE_SHAPED.search(token) and name.lower() not in PRODUCT_NAMES:
+            code_terms.append(name)
+    if code_terms:
+        return QueryRoute("lexical", list(dict.fromkeys(code_terms)))
+    # Plain words ("tokenizer") are too common for substring hits to be trusted alone
+    return QueryRoute("hybrid")
+
+
+def _defined_name(term: str) -> str:
+    # A dotted/qualified term (ContextEngine.query, Foo::bar) is defined by its last part
+    return re.split(r"\.|::", term)[-1]
+
+
+def _pg_regex_escape(term: str) -> str:
+    return re.sub(r"([.^$*+?()\[\]{}|\\])", r"\\\1", term)
+
+
+@dataclass
+class LexicalHit:
+    # chunk.score is matched_terms, plus one if the chunk defines a term
+    chunk: RetrievedChunk
+    matched_terms: int
+    defines: bool
+
+    def has_symbols(self, terms: list[str]) -> bool:
+        """Every term appears as a whole identifier (not inside a longer name or word)."""
+        return all(
+            re.search(rf"(?<!\w){re.escape(t)}(?!\w)", self.chunk.content)
+            for t in terms if len(t) >= 3
+        )
+
+
+class LexicalRetriever:
+    """Trigram / full-text search over chunk content (indexes from migration 006)."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def search_terms(self, repo_id: UUID, terms: list[str], limit: int) -> list[LexicalHit]:
+        """
+        Chunks containing any of the terms (case-sensitive substring, served by
+        the trigram index). Chunks that define a term come first, then those
+        matching the most terms.
+        """
+        terms = [t for t in terms if len(t) >= 3]
+        if not terms:
+            return []
+
+        contains = [CodeEmbedding.content.contains(t, autoescape=True) for t in terms]
+        matched = sum(case((c, 1), else_=0) for c in contains)
+        defines = or_(*(
+            CodeEmbedding.content.op("~")(rf"{DEFINITION_KEYWORDS}\s+{_pg_regex_escape(_defined_name(t))}\M")
+            for t in terms
+        ))
+        stmt = select(*CHUNK_COLUMNS, matched.label("matched"), defines.label("defines")).filter(
+            CodeEmbedding.repo_id == repo_id,
+            or_(*contains)
+        ).order_by(
+            defines.desc(), matched.desc(), CodeEmbedding.file_path, CodeEmbedding.chunk_index
+        ).limit(limit)
+
+        result = await self.db.execute(stmt)
+        rows = result.all()
+        chunks = chunks_from_rows(rows, score=lambda row: row.matched + (1 if row.defines else 0))
+        return [LexicalHit(chunk, row.matched, bool(row.defines)) for chunk, row in zip(chunks, rows)]
+
+    async def search_text(self, repo_id: UUID, query: str, limit: int) -> list[RetrievedChunk]:
+        """Full-text match on any of the query's significant words, ranked by ts_rank_cd."""
+        words = [
+            w for w in dict.fromkeys(re.findall(r"[A-Za-z0-9]+", query.lower()))
+            if len(w) > 2 and w not in STOPWORDS
+        ]
+        if not words:
+            return []
+
+        tsquery = func.to_tsquery(literal_column("'simple'"), bindparam("tsquery", " | ".join(words), type_=String))
+        rank = func.ts_rank_cd(TSVECTOR, tsquery)
+        stmt = select(*CHUNK_COLUMNS, rank.label("score")).filter(
+            CodeEmbedding.repo_id == repo_id,
+            TSVECTOR.op("@@")(tsquery)
+        ).order_by(rank.desc()).limit(limit)
+
+        result = await self.db.execute(stmt)
+        return chunks_from_rows(result.all())
+
+
+def is_confident(hits: list[LexicalHit], terms: list[str]) -> bool:
+    """
+    Lexical results can stand alone (skipping the embedding call) only if
+    the best hit defines a term, or has every term as a whole identifier.
+    Plain substring containment isn't enough.
+    """
+    if not hits:
+        return False
+    best = hits[0]
+    return best.defines or best.has_symbols(terms)
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[list[RetrievedChunk]],
+    k: int = 60,
+    limit: Optional[int] = None
+) -> list[RetrievedChunk]:
+    """
+    Fuses ranked lists: score(chunk) = sum over lists of 1 / (k + rank).
+    The returned chunks carry the fused score.
+    """
+    scores: dict[UUID, float] = {}
+    chunks: dict[UUID, RetrievedChunk] = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, start=1):
+            scores[chunk.id] = scores.get(chunk.id, 0.0) + 1.0 / (k + rank)
+            chunks.setdefault(chunk.id, chunk)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [replace(chunks[chunk_id], score=scores[chunk_id]) for chunk_id in ordered[:limit]]
@@ -0,0 +1,323 @@
+import asyncio
+import json
+import os
+import shutil
+import socket
+import uuid
+from typing import Optional
+from uuid import UUID
+
+import numpy as np
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import select, func, cast, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repose.core.config import settings
+from repose.core.llm.base import CODE_EMBED_DIM
+from repose.core.rag.retrieval import CHUNK_COLUMNS, RetrievedChunk
+from repose.core.redis import get_redis
+from repose.db.session import AsyncSessionLocal
+from repose.models.embedding import CodeEmbedding
+
+# Indexes are built by the API process that serves them, into its own host's
+# LOCAL_INDEX_DIR, so API and Celery hosts never need a shared directory. The
+# indexing worker only bumps the repo's generation in Redis; an index built at
+# an older generation is stale and is ignored (and rebuilt) by every host.
+
+# Sorted set of repo_id -> retrieval count; only the top LOCAL_INDEX_WARM_REPOS get an index
+HOT_REPOS_KEY = "repose:retrieval:hot_repos"
+# Bumped by every re-index of the repo
+GENERATION_KEY = "repose:local_index:generation:{repo_id}"
+# Set to the generation at which the repo was empty or over LOCAL_INDEX_MAX_CHUNKS
+INELIGIBLE_KEY = "repose:local_index:ineligible:{repo_id}"
+INELIGIBLE_TTL = 7 * 24 * 3600
+# Held while a build runs on a host, so concurrent misses (and other API processes
+# on the same host) don't start it again
+BUILD_LOCK_KEY = "repose:local_index:building:{host}:{repo_id}"
+BUILD_LOCK_TTL = 600
+
+BUILD_BATCH_ROWS = 1000
+
+# Per-chunk metadata, parallel to the rows of vectors.npy; content lives in
+# content.bin at [offset, offset + length) and paths in files.json
+META_DTYPE = np.dtype([
+    ("id", "V16"),
+    ("chunk_index", "<i4"),
+    ("start_line", "<i4"),
+    ("end_line", "<i4"),
+    ("path", "<i4"),
+    ("offset", "<i8"),
+    ("length", "<i8"),
+])
+
+
+def _repo_link(repo_id) -> str:
+    # Symlink to the repo's current version directory; swapped atomically on rebuild
+    return os.path.join(settings.LOCAL_INDEX_DIR, str(repo_id))
+
+
+class LocalIndex:
+    """
+    One repo's embeddings as memory-mapped arrays.
+
+    vectors.npy holds L2-normalised float32 rows, so cosine similarity is a
+    single matmul. Files are mapped read-only, so every worker process on the
+    host shares the same page cache copy.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+        self.rows = manifest["chunks"]
+        # Repo generation the index was exported at (see GENERATION_KEY)
+        self.generation = manifest.get("generation", 0)
+        with open(os.path.join(path, "files.json")) as f:
+            files = json.load(f)
+        self.paths = files["paths"]
+        self.languages = files["languages"]
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")[:self.rows]
+        self.meta = np.load(os.path.join(path, "meta.npy"), mmap_mode="r")
+        content_path = os.path.join(path, "content.bin")
+        # mmap refuses empty files
+        if os.path.getsize(content_path):
+            self.content = np.memmap(content_path, dtype=np.uint8, mode="r")
+        else:
+            self.content = np.zeros(0, dtype=np.uint8)
+
+    def search(self, query_embedding: list[float], top_k: int = 5) -> list[RetrievedChunk]:
+        """Exact top_k by cosine similarity (brute force over every chunk)."""
+        q = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm:
+            q = q / norm
+
+        scores = self.vectors @ q
+        k = min(top_k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self._chunk(i, float(scores[i])) for i in top]
+
+    def warm(self):
+        """Faults the vectors into the page cache."""
+        np.add.reduce(self.vectors, axis=0)
+
+    def _chunk(self, i: int, score: float) -> RetrievedChunk:
+        m = self.meta[i]
+        content = self.content[m["offset"]:m["offset"] + m["length"]].tobytes().decode("utf-8")
+        return RetrievedChunk(
+            id=UUID(bytes=m["id"].tobytes()),
+            file_path=self.paths[m["path"]],
+            chunk_index=int(m["chunk_index"]),
+            content=content,
+            language=self.languages[m["path"]],
+            start_line=int(m["start_line"]),
+            end_line=int(m["end_line"]),
+            score=score,
+        )
+
+
+# repo_id -> (version dir the index was loaded from, index)
+_loaded: dict[str, tuple[str, LocalIndex]] = {}
+
+
+def load_local_index(repo_id) -> Optional[LocalIndex]:
+    """The repo's index on this host, reloading it if another process rebuilt it (may be stale)."""
+    key = str(repo_id)
+    try:
+        version = os.readlink(_repo_link(key))
+    except OSError:
+        _loaded.pop(key, None)
+        return None
+
+    cached = _loaded.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+    try:
+        index = LocalIndex(os.path.join(settings.LOCAL_INDEX_DIR, version))
+    except (OSError, ValueError, KeyError) as e:
+        # Mid-swap or a partial build; the pgvector backend serves this one
+        print(f"Error loading local index for repo {key}: {e}")
+        return None
+    _loaded[key] = (version, index)
+    return index
+
+
+async def get_generation(repo_id) -> int:
+    return int(await get_redis().get(GENERATION_KEY.format(repo_id=repo_id)) or 0)
+
+
+async def bump_generation(repo_id):
+    """Marks every host's local index of the repo stale (call after re-indexing it)."""
+    # Also re-checks eligibility, since INELIGIBLE_KEY holds the old generation
+    try:
+        await get_redis().incr(GENERATION_KEY.format(repo_id=repo_id))
+    except Exception as e:
+        print(f"Error invalidating local index for repo {repo_id}: {e}")
+
+
+def _remove_versions(repo_id: str, keep: Optional[str] = None):
+    # Processes that still have old files mapped keep reading them until they reload
+    for name in os.listdir(settings.LOCAL_INDEX_DIR):
+        if name.startswith(f"{repo_id}.") and name != keep:
+            shutil.rmtree(os.path.join(settings.LOCAL_INDEX_DIR, name), ignore_errors=True)
+
+
+async def build_local_index(db: AsyncSession, repo_id: UUID, generation: Optional[int] = None) -> Optional[str]:
+    """
+    Exports a repo's embeddings from Postgres into a new version directory
+    on this host and atomically points the repo's symlink at it. Returns the
+    version, or None when the repo is empty or too large for the local
+    backend (recorded, so it isn't retried until the repo is re-indexed).
+    """
+    if generation is None:
+        generation = await get_generation(repo_id)
+    has_vector = or_(CodeEmbedding.embedding.is_not(None), CodeEmbedding.embedding_half.is_not(None))
+    count = await db.scalar(
+        select(func.count()).select_from(CodeEmbedding).filter(CodeEmbedding.repo_id == repo_id, has_vector)
+    )
+    if not count or count > settings.LOCAL_INDEX_MAX_CHUNKS:
+        print(f"Skipping local index for repo {repo_id}: {count} chunks")
+        await get_redis().set(INELIGIBLE_KEY.format(repo_id=repo_id), generation, ex=INELIGIBLE_TTL)
+        return None
+
+    os.makedirs(settings.LOCAL_INDEX_DIR, exist_ok=True)
+    version = f"{repo_id}.{uuid.uuid4().hex}"
+    tmp_dir = os.path.join(settings.LOCAL_INDEX_DIR, f".{version}.tmp")
+    os.makedirs(tmp_dir)
+
+    vector = func.coalesce(CodeEmbedding.embedding, cast(CodeEmbedding.embedding_half, Vector(CODE_EMBED_DIM)))
+    stmt = select(*CHUNK_COLUMNS, vector.label("vector")).filter(
+        CodeEmbedding.repo_id == repo_id, has_vector
+    ).order_by(CodeEmbedding.file_path, CodeEmbedding.chunk_index).limit(count)
+
+    try:
+        vectors = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, "vectors.npy"), mode="w+", dtype=np.float32, shape=(count, CODE_EMBED_DIM)
+        )
+        meta = np.zeros(count, dtype=META_DTYPE)
+        path_ids: dict[str, int] = {}
+        languages: list[str] = []
+        offset = 0
+        n = 0
+
+        result = await db.stream(stmt)
+        with open(os.path.join(tmp_dir, "content.bin"), "wb") as content_file:
+            async for rows in result.partitions(BUILD_BATCH_ROWS):
+                block = np.stack([np.asarray(r.vector, dtype=np.float32) for r in rows])
+                norms = np.linalg.norm(block, axis=1, keepdims=True)
+                vectors[n:n + len(rows)] = block / np.where(norms == 0, 1, norms)
+
+                for r in rows:
+                    if r.file_path not in path_ids:
+                        path_ids[r.file_path] = len(languages)
+                        languages.append(r.language or "text")
+                    data = r.content.encode("utf-8")
+                    content_file.write(data)
+                    meta[n] = (
+                        r.id.bytes, r.chunk_index, r.start_line or 0, r.end_line or 0,
+                        path_ids[r.file_path], offset, len(data),
+                    )
+                    offset += len(data)
+                    n += 1
+
+        # Rows may have been deleted since the count; readers only use the first n
+        vectors.flush()
+        del vectors
+        np.save(os.path.join(tmp_dir, "meta.npy"), meta[:n])
+        with open(os.path.join(tmp_dir, "files.json"), "w") as f:
+            json.dump({"paths": list(path_ids), "languages": languages}, f)
+        with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+            json.dump({"repo_id": str(repo_id), "chunks": n, "dim": CODE_EMBED_DIM, "generation": generation}, f)
+
+        os.rename(tmp_dir, os.path.join(settings.LOCAL_INDEX_DIR, version))
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Swap the symlink atomically so readers see either the old or the new version
+    tmp_link = os.path.join(settings.LOCAL_INDEX_DIR, f".{version}.link")
+    os.symlink(version, tmp_link)
+    os.replace(tmp_link, _repo_link(repo_id))
+    _remove_versions(str(repo_id), keep=version)
+    print(f"Built local index for repo {repo_id}: {n} chunks")
+    return version
+
+
+async def lookup(repo_id: UUID) -> Optional[LocalIndex]:
+    """
+    The repo's up-to-date local index, or None (serve from pgvector).
+    Counts the query towards the repo's hotness, and starts a build on this
+    host if the repo is among the LOCAL_INDEX_WARM_REPOS hottest, has no
+    current index here, and isn't known to be ineligible.
+    """
+    key = str(repo_id)
+    try:
+        async with get_redis().pipeline(transaction=False) as pipe:
+            pipe.zincrby(HOT_REPOS_KEY, 1, key)
+            pipe.zrevrank(HOT_REPOS_KEY, key)
+            pipe.get(GENERATION_KEY.format(repo_id=key))
+            pipe.get(INELIGIBLE_KEY.format(repo_id=key))
+            _, rank, generation, ineligible = await pipe.execute()
+    except Exception as e:
+        print(f"Error looking up local index for repo {key}: {e}")
+        return None
+    generation = int(generation or 0)
+
+    index = load_local_index(key)
+    if index is not None and index.generation == generation:
+        return index
+    if rank is not None and rank < settings.LOCAL_INDEX_WARM_REPOS and (
+        ineligible is None or int(ineligible) != generation
+    ):
+        await request_build(key, generation)
+    return None
+
+
+# Builds running in this process (held so the tasks aren't garbage collected)
+_build_tasks: set[asyncio.Task] = set()
+
+
+async def request_build(repo_id, generation: Optional[int] = None):
+    """Starts a background build in this process unless one is already running on this host."""
+    key = BUILD_LOCK_KEY.format(host=socket.gethostname(), repo_id=repo_id)
+    try:
+        if not await get_redis().set(key, 1, nx=True, ex=BUILD_LOCK_TTL):
+            return
+    except Exception as e:
+        print(f"Error queueing local index build for repo {repo_id}: {e}")
+        return
+
+    async def _build():
+        try:
+            async with AsyncSessionLocal() as db:
+                await build_local_index(db, UUID(str(repo_id)), generation)
+        except Exception as e:
+            print(f"Error building local index for repo {repo_id}: {e}")
+        finally:
+            try:
+                await get_redis().delete(key)
+            except Exception:
+                pass
+
+    task = asyncio.create_task(_build())
+    _build_tasks.add(task)
+    task.add_done_callback(_build_tasks.discard)
+
+
+async def warm_hot_repos(limit: int = settings.LOCAL_INDEX_WARM_REPOS):
+    """Loads the most-queried repos' indexes into memory, building missing or stale ones."""
+    try:
+        repo_ids = await get_redis().zrevrange(HOT_REPOS_KEY, 0, limit - 1)
+    except Exception as e:
+        print(f"Error reading hot repos: {e}")
+        return
+
+    for repo_id in repo_ids:
+        # lookup() also counts a hit; harmless for repos that are already the hottest
+        index = await lookup(repo_id)
+        if index is not None:
+            await asyncio.to_thread(index.warm)
+    print(f"Warmed local indexes for {len(repo_ids)} hot repos")
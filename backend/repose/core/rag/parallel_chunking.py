@@ -0,0 +1,221 @@
+import asyncio
+import atexit
+import os
+import threading
+from typing import AsyncIterable, AsyncIterator, Optional
+
+import billiard
+from billiard.pool import Pool
+
+from repose.core.config import settings
+from repose.core.rag.chunking import Chunk, ChunkingService
+
+ChunkResult = tuple[str, Optional[list[Chunk]]]
+
+# billiard (Celery's fork of multiprocessing) lets daemonic processes have children,
+# so the pool also works inside Celery prefork children, where indexing runs
+_pool: Optional[Pool] = None
+# A forked child inherits _pool but not its manager threads; the pool is only usable in its creator
+_pool_pid: Optional[int] = None
+_pool_unavailable = False
+# No shard finishing for this long means the pool is wedged (a killed worker can leave
+# its task queue locked, so queued shards never start and never fail)
+POOL_STALL_SECONDS = 60
+
+
+def read_and_chunk(chunker: ChunkingService, repo_path: str, rel_path: str) -> Optional[list[Chunk]]:
+    """Reads and chunks one file; returns None if it can't be read as UTF-8 text."""
+    file_path = os.path.join(repo_path, rel_path)
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return chunker.chunk_file(rel_path, content)
+    except Exception as e:
+        print(f"Error processing file {file_path}: {e}")
+        return None
+
+
+def _chunk_shard(chunker: ChunkingService, repo_path: str, rel_paths: list[str]) -> list[ChunkResult]:
+    # Runs in a pool process
+    return [(rel_path, read_and_chunk(chunker, repo_path, rel_path)) for rel_path in rel_paths]
+
+
+def _resolve_workers(workers: int) -> int:
+    # 0 means "one per core"
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def _get_pool(workers: int) -> Optional[Pool]:
+    """Lazily creates the process-wide pool; None when processes can't be spawned here."""
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid != os.getpid():
+        _pool = None
+    if _pool is None and not _pool_unavailable:
+        try:
+            _pool = billiard.Pool(processes=workers)
+            _pool_pid = os.getpid()
+        except (OSError, NotImplementedError) as e:
+            _disable_pool(e)
+    return _pool
+
+
+def _disable_pool(reason):
+    global _pool_unavailable
+    print(f"Process pool unavailable, chunking in a thread instead: {reason}")
+    _pool_unavailable = True
+    # A worker killed mid-send can leave the pool's queue locks held, so tearing a
+    # broken pool down may block forever; don't do it on the event loop
+    shutdown_pool(wait=False)
+
+
+def shutdown_pool(wait: bool = True):
+    """Stops the pool's worker processes (interpreter exit / Celery worker shutdown)."""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is None or _pool_pid != os.getpid():
+        return
+
+    def stop():
+        pool.terminate()
+        pool.join()
+
+    if wait:
+        stop()
+    else:
+        threading.Thread(target=stop, daemon=True).start()
+
+
+# Join the workers before interpreter teardown closes their pipes
+atexit.register(shutdown_pool)
+
+
+def _apply(pool: Pool, loop: asyncio.AbstractEventLoop, *args) -> asyncio.Future:
+    """Runs _chunk_shard in the pool, resolving an asyncio future from the pool's result thread."""
+    future = loop.create_future()
+
+    def resolve(setter, value):
+        if not future.done():
+            setter(value)
+
+    def failed(einfo):
+        # billiard reports errors (including WorkerLostError) as an ExceptionInfo
+        e = getattr(einfo, "exception", einfo)
+        if not isinstance(e, BaseException):
+            e = RuntimeError(str(einfo))
+        loop.call_soon_threadsafe(resolve, future.set_exception, e)
+
+    pool.apply_async(
+        _chunk_shard, args,
+        callback=lambda result: loop.call_soon_threadsafe(resolve, future.set_result, result),
+        error_callback=failed,
+    )
+    return future
+
+
+class ParallelChunker:
+    """
+    Fans file reading, chunking and hashing out to a process pool.
+
+    Paths are packed into shards of roughly shard_bytes each so every
+    worker gets a similar amount of text, and results are yielded as soon
+    as a shard finishes. With a single worker (or where a pool can't be
+    created) files are chunked one at a time in a thread instead; if the
+    pool breaks mid-run, its unfinished shards are redone in a thread.
+    """
+
+    def __init__(
+        self,
+        chunker: ChunkingService,
+        workers: int = settings.INDEX_CHUNK_WORKERS,
+        shard_bytes: int = settings.INDEX_CHUNK_SHARD_BYTES,
+    ):
+        self.chunker = chunker
+        self.workers = _resolve_workers(workers)
+        self.shard_bytes = shard_bytes
+
+    async def chunk_files(self, repo_path: str, rel_paths: AsyncIterable[str]) -> AsyncIterator[ChunkResult]:
+        pool = _get_pool(self.workers) if self.workers > 1 else None
+        if pool is None:
+            async for rel_path in rel_paths:
+                yield rel_path, await asyncio.to_thread(read_and_chunk, self.chunker, repo_path, rel_path)
+            return
+
+        loop = asyncio.get_running_loop()
+        # Keep every worker busy with one queued shard behind it, but no more
+        max_in_flight = self.workers * 2
+        # In-flight future -> the shard it's chunking (to redo it if the pool breaks)
+        pending: dict[asyncio.Future, list[str]] = {}
+        shard: list[str] = []
+        shard_size = 0
+
+        def in_thread(paths: list[str]) -> asyncio.Future:
+            return asyncio.ensure_future(asyncio.to_thread(_chunk_shard, self.chunker, repo_path, paths))
+
+        def submit(paths: list[str]):
+            nonlocal pool
+            if pool is not None:
+                try:
+                    pending[_apply(pool, loop, self.chunker, repo_path, paths)] = paths
+                    return
+                except (AssertionError, OSError, RuntimeError, ValueError) as e:
+                    # Workers may fail to spawn, or the pool may have been closed under us
+                    _disable_pool(e)
+                    pool = None
+            pending[in_thread(paths)] = paths
+
+        def fall_back(e: BaseException):
+            # A worker died or the pool broke: redo every shard it still had in this process
+            nonlocal pool
+            _disable_pool(e)
+            pool = None
+            for future, paths in list(pending.items()):
+                future.cancel()
+                del pending[future]
+                pending[in_thread(paths)] = paths
+
+        async def drain(limit: int) -> AsyncIterator[ChunkResult]:
+            while len(pending) > limit:
+                timeout = POOL_STALL_SECONDS if pool is not None else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    fall_back(TimeoutError(f"no shard finished in {POOL_STALL_SECONDS}s"))
+                    continue
+                for future in done:
+                    paths = pending.pop(future, None)
+                    if paths is None:
+                        # Already requeued by fall_back() earlier in this round
+                        continue
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        if pool is None:
+                            raise
+                        fall_back(e)
+                        pending[in_thread(paths)] = paths
+                        continue
+                    for result in results:
+                        yield result
+
+        try:
+            async for rel_path in rel_paths:
+                try:
+                    size = os.path.getsize(os.path.join(repo_path, rel_path))
+                except OSError:
+                    size = 0
+                shard.append(rel_path)
+                shard_size += size
+                if shard_size < self.shard_bytes:
+                    continue
+
+                submit(shard)
+                shard, shard_size = [], 0
+                async for result in drain(max_in_flight - 1):
+                    yield result
+
+            if shard:
+                submit(shard)
+            async for result in drain(0):
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
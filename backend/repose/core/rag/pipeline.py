@@ -0,0 +1,213 @@
+import asyncio
+import concurrent.futures
+import threading
+from dataclasses import dataclass, field
+from typing import Iterable
+from uuid import UUID
+
+from sqlalchemy import text, bindparam, String, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repose.core.config import settings
+from repose.core.llm import LLMClient
+from repose.core.rag.bulk_writer import EmbeddingWriter
+from repose.core.rag.chunking import Chunk, ChunkingService
+from repose.core.rag.embedding_cache import EmbeddingCache
+from repose.core.rag.parallel_chunking import ParallelChunker
+
+# Deletes chunk rows at or beyond each file's new chunk count
+PRUNE_TRAILING_CHUNKS = text("""
+    DELETE FROM code_embeddings ce
+    USING unnest(:paths, :counts) AS f(file_path, n_chunks)
+    WHERE ce.repo_id = :repo_id
+      AND ce.file_path = f.file_path
+      AND ce.chunk_index >= f.n_chunks
+""").bindparams(
+    bindparam("paths", type_=ARRAY(String)),
+    bindparam("counts", type_=ARRAY(Integer)),
+)
+
+# How many files' chunk counts to accumulate before pruning their trailing rows
+PRUNE_FLUSH_SIZE = 500
+
+_DONE = object()
+
+
+@dataclass
+class IndexStats:
+    files: int = 0
+    chunks: int = 0
+    failed_files: int = 0
+    failed_batches: int = 0
+    # Every path that was fed to the pipeline (full index uses it to drop removed files)
+    seen_paths: list[str] = field(default_factory=list)
+
+
+class IndexingPipeline:
+    """
+    Streaming indexer: walk -> read/chunk (process pool) -> embed -> write.
+    Stages are connected by bounded queues, so file reading, embedding calls and
+    DB writes overlap while peak memory is capped by queue_depth batches.
+    Any stage raising cancels the others (TaskGroup); per-file and per-batch
+    failures are logged and counted instead.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        llm_client: LLMClient,
+        chunker: ChunkingService,
+        embedding_cache: EmbeddingCache,
+        batch_size: int = settings.INDEX_BATCH_SIZE,
+        queue_depth: int = settings.INDEX_QUEUE_DEPTH,
+    ):
+        self.db = db
+        self.llm = llm_client
+        self.chunker = chunker
+        self.embedding_cache = embedding_cache
+        self.batch_size = batch_size
+        self.queue_depth = queue_depth
+        self.writer = EmbeddingWriter(db)
+        self.parallel_chunker = ParallelChunker(chunker)
+        # The embed and write stages share one session; never use it concurrently
+        self._db_lock = asyncio.Lock()
+
+    async def run(self, repo_id: UUID, repo_path: str, rel_paths: Iterable[str]) -> IndexStats:
+        """
+        Indexes the given repo-relative paths. rel_paths may be a lazy iterable
+        (e.g. a directory walk); it is consumed in a worker thread.
+        """
+        stats = IndexStats()
+        path_q: asyncio.Queue = asyncio.Queue(maxsize=self.batch_size * self.queue_depth)
+        chunk_q: asyncio.Queue = asyncio.Queue(maxsize=self.batch_size * self.queue_depth)
+        write_q: asyncio.Queue = asyncio.Queue(maxsize=self.queue_depth)
+
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(self._walk_stage(rel_paths, path_q, stats))
+            tg.create_task(self._chunk_stage(repo_id, repo_path, path_q, chunk_q, stats))
+            tg.create_task(self._embed_stage(chunk_q, write_q, stats))
+            tg.create_task(self._write_stage(repo_id, write_q, stats))
+
+        return stats
+
+    async def _walk_stage(self, rel_paths: Iterable[str], path_q: asyncio.Queue, stats: IndexStats):
+        loop = asyncio.get_running_loop()
+        stop = threading.Event()
+
+        def produce():
+            # Runs in a thread so a slow filesystem walk never blocks the loop;
+            # blocking on the bounded queue gives us backpressure.
+            for rel_path in rel_paths:
+                stats.seen_paths.append(rel_path)
+                future = asyncio.run_coroutine_threadsafe(path_q.put(rel_path), loop)
+                while True:
+                    try:
+                        future.result(timeout=1)
+                        break
+                    except concurrent.futures.TimeoutError:
+                        if stop.is_set():
+                            future.cancel()
+                            return
+
+        try:
+            await asyncio.to_thread(produce)
+        finally:
+            # Unblocks the thread if another stage failed and we were cancelled
+            stop.set()
+        await path_q.put(_DONE)
+
+    async def _chunk_stage(
+        self,
+        repo_id: UUID,
+        repo_path: str,
+        path_q: asyncio.Queue,
+        chunk_q: asyncio.Queue,
+        stats: IndexStats
+    ):
+        async def paths():
+            while (rel_path := await path_q.get()) is not _DONE:
+                yield rel_path
+
+        chunk_counts: dict[str, int] = {}
+        async for rel_path, chunks in self.parallel_chunker.chunk_files(repo_path, paths()):
+            if chunks is None:
+                stats.failed_files += 1
+                continue
+
+            stats.files += 1
+            chunk_counts[rel_path] = len(chunks)
+            for chunk in chunks:
+                await chunk_q.put(chunk)
+
+            if len(chunk_counts) >= PRUNE_FLUSH_SIZE:
+                await self._prune_trailing(repo_id, chunk_counts)
+                chunk_counts = {}
+
+        await self._prune_trailing(repo_id, chunk_counts)
+        await chunk_q.put(_DONE)
+
+    async def _embed_stage(self, chunk_q: asyncio.Queue, write_q: asyncio.Queue, stats: IndexStats):
+        # Several batches may be embedding at once; the LLM client's executor
+        # enforces the provider's concurrency and rate limits underneath.
+        in_flight = asyncio.Semaphore(self.queue_depth)
+        pending: set[asyncio.Task] = set()
+
+        async def flush(batch: list[Chunk]):
+            try:
+                # Chunks whose hash was embedded before (any repo) come from the cache
+                embeddings = await self.embedding_cache.embed_chunks(self.llm, batch, db_lock=self._db_lock)
+                await write_q.put((batch, embeddings))
+            except Exception as e:
+                print(f"Error generating embeddings for batch: {e}")
+                stats.failed_batches += 1
+            finally:
+                in_flight.release()
+
+        def submit(batch: list[Chunk]):
+            task = asyncio.create_task(flush(batch))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        try:
+            batch: list[Chunk] = []
+            while (chunk := await chunk_q.get()) is not _DONE:
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    await in_flight.acquire()
+                    submit(batch)
+                    batch = []
+            if batch:
+                await in_flight.acquire()
+                submit(batch)
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            for task in pending:
+                task.cancel()
+        await write_q.put(_DONE)
+
+    async def _write_stage(self, repo_id: UUID, write_q: asyncio.Queue, stats: IndexStats):
+        while (item := await write_q.get()) is not _DONE:
+            batch, embeddings = item
+            async with self._db_lock:
+                try:
+                    await self.writer.write(repo_id, batch, embeddings)
+                    await self.db.commit()
+                    stats.chunks += len(batch)
+                except Exception as e:
+                    print(f"Error writing embeddings for batch: {e}")
+                    stats.failed_batches += 1
+                    await self.db.rollback()
+
+    async def _prune_trailing(self, repo_id: UUID, chunk_counts: dict[str, int]):
+        """Files that shrank keep rows past their new last chunk; drop them."""
+        if not chunk_counts:
+            return
+        async with self._db_lock:
+            await self.db.execute(PRUNE_TRAILING_CHUNKS, {
+                "repo_id": repo_id,
+                "paths": list(chunk_counts.keys()),
+                "counts": list(chunk_counts.values()),
+            })
+            await self.db.commit()
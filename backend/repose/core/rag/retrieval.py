@@ -0,0 +1,146 @@
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import select, text, cast
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repose.core.config import settings
+from repose.core.llm.base import CODE_EMBED_DIM
+from repose.core.rag.storage import quantize_binary, validate_storage
+from repose.models.embedding import CodeEmbedding
+
+# pgvector rejects larger hnsw.ef_search values
+MAX_EF_SEARCH = 1000
+
+
+@dataclass(slots=True)
+class RetrievedChunk:
+    """
+    A retrieval hit: the columns the chat path needs, without the vector.
+    score is higher-is-better and only comparable within one result list
+    (cosine similarity, lexical rank, or fused RRF score).
+    """
+    id: UUID
+    file_path: str
+    chunk_index: int
+    start_line: Optional[int]
+    end_line: Optional[int]
+    language: Optional[str]
+    content: str
+    score: float
+
+
+# Projection for RetrievedChunk (never the embedding columns)
+CHUNK_COLUMNS = (
+    CodeEmbedding.id,
+    CodeEmbedding.file_path,
+    CodeEmbedding.chunk_index,
+    CodeEmbedding.start_line,
+    CodeEmbedding.end_line,
+    CodeEmbedding.language,
+    CodeEmbedding.content,
+)
+
+
+def chunks_from_rows(rows, score=lambda row: row.score) -> list[RetrievedChunk]:
+    return [
+        RetrievedChunk(
+            id=row.id,
+            file_path=row.file_path,
+            chunk_index=row.chunk_index,
+            start_line=row.start_line,
+            end_line=row.end_line,
+            language=row.language,
+            content=row.content,
+            score=float(score(row)),
+        )
+        for row in rows
+    ]
+
+
+class VectorRetriever:
+    """Nearest-neighbour search over a repository's chunk embeddings."""
+
+    def __init__(self, db: AsyncSession, storage: str = settings.EMBEDDING_STORAGE):
+        validate_storage(storage)
+        self.db = db
+        self.storage = storage
+
+    async def search(
+        self,
+        repo_id: UUID,
+        query_embedding: list[float],
+        top_k: int = 5,
+        search_mode: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        rerank_factor: Optional[int] = None
+    ) -> list[RetrievedChunk]:
+        """
+        Nearest chunks to an embedding by cosine distance; score is cosine similarity.
+        "ann" walks the HNSW index with hnsw.ef_search set for this transaction,
+        falling back to "exact" if it returns fewer than top_k rows;
+        "exact" orders by an expression the index can't serve, forcing a full scan.
+        With compact storage, "ann" is two-stage: the index returns
+        top_k * rerank_factor candidates, which are re-ranked by exact cosine
+        distance between the full-precision query and the stored vectors.
+        """
+        search_mode = search_mode or settings.RETRIEVAL_SEARCH_MODE
+        if self.storage == "full":
+            stored = CodeEmbedding.embedding
+            precise = CodeEmbedding.embedding.cosine_distance(query_embedding)
+        else:
+            stored = CodeEmbedding.embedding_half
+            precise = cast(CodeEmbedding.embedding_half, Vector(CODE_EMBED_DIM)).cosine_distance(query_embedding)
+        in_repo = (CodeEmbedding.repo_id == repo_id, stored.is_not(None))
+
+        columns = (*CHUNK_COLUMNS, precise.label("distance"))
+        if search_mode == "exact":
+            stmt = select(*columns).filter(*in_repo).order_by(precise + 0).limit(top_k)
+            return await self._fetch(stmt)
+        if search_mode != "ann":
+            raise ValueError(f"Unknown retrieval search mode: {search_mode}")
+
+        if self.storage == "full":
+            # float32 distances are already exact; no re-rank needed
+            await self._set_ef_search(ef_search, top_k)
+            stmt = select(*columns).filter(*in_repo).order_by(precise).limit(top_k)
+            return await self._fetch_or_exact(stmt, repo_id, query_embedding, top_k)
+
+        if self.storage == "halfvec":
+            coarse = CodeEmbedding.embedding_half.cosine_distance(query_embedding)
+        else:
+            coarse = CodeEmbedding.embedding_bits.hamming_distance(quantize_binary(query_embedding))
+        n_candidates = top_k * (rerank_factor or settings.RETRIEVAL_RERANK_FACTOR)
+        await self._set_ef_search(ef_search, n_candidates)
+
+        candidates = select(CodeEmbedding.id).filter(*in_repo).order_by(coarse).limit(n_candidates).subquery()
+        stmt = select(*columns).join(
+            candidates, CodeEmbedding.id == candidates.c.id
+        ).order_by(precise).limit(top_k)
+        # The candidate stage is filtered after the index scan too
+        return await self._fetch_or_exact(stmt, repo_id, query_embedding, top_k)
+
+    async def _fetch_or_exact(self, stmt, repo_id: UUID, query_embedding: list[float], top_k: int) -> list[RetrievedChunk]:
+        """
+        The HNSW index is shared by every repo and the repo filter is applied
+        to what the index scan returns (at most ef_search rows), so a small
+        repo in a big table can come back short or empty. Short results are
+        redone as an exact scan of just that repo (served by the
+        (repo_id, ...) unique index), which is cheap precisely when the repo
+        is small.
+        """
+        chunks = await self._fetch(stmt)
+        if len(chunks) < top_k:
+            return await self.search(repo_id, query_embedding, top_k, search_mode="exact")
+        return chunks
+
+    async def _fetch(self, stmt) -> list[RetrievedChunk]:
+        result = await self.db.execute(stmt)
+        return chunks_from_rows(result.all(), score=lambda row: 1 - row.distance)
+
+    async def _set_ef_search(self, ef_search: Optional[int], limit: int):
+        # ef_search below the LIMIT would return fewer rows than asked for
+        ef = min(max(ef_search or settings.RETRIEVAL_EF_SEARCH, limit), MAX_EF_SEARCH)
+        await self.db.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef)}"))
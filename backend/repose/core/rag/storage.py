@@ -0,0 +1,80 @@
+from typing import Any
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repose.core.llm.base import CODE_EMBED_DIM
+
+# How chunk embeddings are stored in code_embeddings:
+#   "full"    - float32 `embedding` (~6 KB/chunk), searched directly
+#   "halfvec" - float16 `embedding_half` only (~3 KB/chunk)
+#   "binary"  - 1 bit/dim `embedding_bits` for the coarse search, plus
+#               `embedding_half` to re-rank the candidates
+STORAGE_MODES = ("full", "halfvec", "binary")
+
+VECTOR_COLUMNS = ("embedding", "embedding_half", "embedding_bits")
+
+
+def validate_storage(storage: str):
+    if storage not in STORAGE_MODES:
+        raise ValueError(f"Unknown embedding storage mode: {storage}")
+
+
+def storage_expressions(storage: str, source: str) -> dict[str, str]:
+    """
+    SQL for each vector column given `source`, a full-precision vector expression.
+    Quantization happens in Postgres (pgvector casts), so every write path agrees.
+    """
+    validate_storage(storage)
+    half = f"({source})::halfvec({CODE_EMBED_DIM})"
+    if storage == "full":
+        return {"embedding": source, "embedding_half": "NULL", "embedding_bits": "NULL"}
+    if storage == "halfvec":
+        return {"embedding": "NULL", "embedding_half": half, "embedding_bits": "NULL"}
+    return {
+        "embedding": "NULL",
+        "embedding_half": half,
+        "embedding_bits": f"binary_quantize({source})::bit({CODE_EMBED_DIM})",
+    }
+
+
+def quantize_binary(embedding: Any) -> str:
+    """Same as pgvector's binary_quantize(): one bit per dimension, set when > 0."""
+    return "".join(np.where(np.asarray(embedding) > 0, "1", "0"))
+
+
+def storage_values(storage: str, embedding: Any) -> dict[str, Any]:
+    """Python-side equivalent of storage_expressions() for bound-parameter inserts."""
+    validate_storage(storage)
+    if storage == "full":
+        return {"embedding": embedding, "embedding_half": None, "embedding_bits": None}
+    if storage == "halfvec":
+        return {"embedding": None, "embedding_half": embedding, "embedding_bits": None}
+    return {"embedding": None, "embedding_half": embedding, "embedding_bits": quantize_binary(embedding)}
+
+
+def _stored_as(storage: str) -> str:
+    # Rows already laid out for `storage`
+    return " AND ".join(
+        f"{column} IS {'NULL' if expr == 'NULL' else 'NOT NULL'}"
+        for column, expr in storage_expressions(storage, "embedding").items()
+    )
+
+
+async def convert_storage(db: AsyncSession, repo_id: UUID, storage: str) -> int:
+    """
+    Rewrites a repo's rows stored under another mode into `storage`.
+    Rows coming from halfvec/binary keep float16 precision when widened back
+    to full. Returns the number of rows converted; the caller commits.
+    """
+    source = f"COALESCE(embedding, embedding_half::vector({CODE_EMBED_DIM}))"
+    assignments = ", ".join(f"{c} = {e}" for c, e in storage_expressions(storage, source).items())
+    result = await db.execute(text(f"""
+        UPDATE code_embeddings SET {assignments}
+        WHERE repo_id = :repo_id
+          AND (embedding IS NOT NULL OR embedding_half IS NOT NULL)
+          AND NOT ({_stored_as(storage)})
+    """), {"repo_id": repo_id})
+    return result.rowcount
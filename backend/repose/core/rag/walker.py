@@ -0,0 +1,184 @@
+import os
+import re
+from dataclasses import dataclass, fields
+from typing import Iterable, Iterator, Optional
+
+import pathspec
+
+from repose.core.agents.monitor import AgentMonitor
+from repose.core.config import settings
+
+INDEXED_EXTENSIONS = ('.py', '.js', '.ts', '.tsx', '.md', '.go', '.rs')
+
+# VCS metadata is never worth descending into
+ALWAYS_PRUNE = {".git", ".hg", ".svn"}
+
+MINIFIED_SUFFIXES = ('.min.js', '.min.css', '.bundle.js')
+# Docs often have long unwrapped paragraphs; never judge them minified by line length
+PROSE_EXTENSIONS = ('.md', '.markdown', '.rst', '.txt')
+
+# How much of a file is sniffed for binary/minified/generated markers
+SNIFF_BYTES = 8192
+# Generated-file headers are expected within the first few lines
+HEADER_LINES = 5
+
+GENERATED_PATTERNS = [re.compile(pattern) for pattern, _ in AgentMonitor.CODE_PATTERNS]
+
+
+@dataclass
+class WalkStats:
+    files: int = 0
+    dirs_pruned: int = 0
+    skipped_extension: int = 0
+    skipped_ignored: int = 0
+    skipped_oversized: int = 0
+    skipped_binary: int = 0
+    skipped_minified: int = 0
+    skipped_generated: int = 0
+
+    def summary(self) -> str:
+        return ", ".join(f"{f.name}={getattr(self, f.name)}" for f in fields(self))
+
+
+class RepositoryWalker:
+    """
+    Finds the files worth indexing in a repository clone.
+
+    Uses os.scandir and prunes ignored directories before descending into
+    them. Honours .gitignore files at every level plus extra gitignore-style
+    exclude patterns (Repository.settings["index_exclude"]). Skips oversized,
+    binary, minified and generated files. Skip counts are kept in self.stats.
+    """
+
+    def __init__(
+        self,
+        repo_path: str,
+        exclude: Optional[list[str]] = None,
+        extensions: tuple[str, ...] = INDEXED_EXTENSIONS,
+        max_file_bytes: int = settings.INDEX_MAX_FILE_BYTES,
+        minified_line_length: int = settings.INDEX_MINIFIED_LINE_LENGTH,
+    ):
+        self.repo_path = repo_path
+        self.extensions = extensions
+        self.max_file_bytes = max_file_bytes
+        self.minified_line_length = minified_line_length
+        self.exclude = pathspec.GitIgnoreSpec.from_lines(exclude or [])
+        self.stats = WalkStats()
+        # dir rel path ("" for root) -> spec from that directory's .gitignore (None if absent)
+        self._gitignores: dict[str, Optional[pathspec.GitIgnoreSpec]] = {}
+
+    def walk(self) -> Iterator[str]:
+        """Yields repo-relative paths of indexable files."""
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                entries = list(os.scandir(os.path.join(self.repo_path, rel_dir)))
+            except OSError as e:
+                print(f"Error scanning {rel_dir or '.'}: {e}")
+                continue
+
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                # Symlinks are skipped so the walk can't escape the clone
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in ALWAYS_PRUNE or self._is_ignored(rel_path, is_dir=True):
+                        self.stats.dirs_pruned += 1
+                    else:
+                        stack.append(rel_path)
+                elif entry.is_file(follow_symlinks=False):
+                    if self._accept_file(rel_path, entry.stat(follow_symlinks=False).st_size):
+                        yield rel_path
+
+    def filter_paths(self, rel_paths: Iterable[str]) -> Iterator[str]:
+        """Applies the same rules as walk() to an explicit list of paths (e.g. a git diff)."""
+        for rel_path in rel_paths:
+            parts = rel_path.split("/")
+            if any(p in ALWAYS_PRUNE for p in parts[:-1]):
+                continue
+            # Any ignored ancestor directory excludes the file, as it would in walk()
+            if any(self._is_ignored("/".join(parts[:i]), is_dir=True) for i in range(1, len(parts))):
+                self.stats.skipped_ignored += 1
+                continue
+            try:
+                size = os.path.getsize(os.path.join(self.repo_path, rel_path))
+            except OSError:
+                continue
+            if self._accept_file(rel_path, size):
+                yield rel_path
+
+    def _accept_file(self, rel_path: str, size: int) -> bool:
+        if not rel_path.endswith(self.extensions):
+            self.stats.skipped_extension += 1
+            return False
+        if self._is_ignored(rel_path, is_dir=False):
+            self.stats.skipped_ignored += 1
+            return False
+        if size > self.max_file_bytes:
+            self.stats.skipped_oversized += 1
+            return False
+        if rel_path.endswith(MINIFIED_SUFFIXES):
+            self.stats.skipped_minified += 1
+            return False
+
+        reason = self._sniff(rel_path)
+        if reason:
+            setattr(self.stats, f"skipped_{reason}", getattr(self.stats, f"skipped_{reason}") + 1)
+            return False
+
+        self.stats.files += 1
+        return True
+
+    def _sniff(self, rel_path: str) -> Optional[str]:
+        """Returns "binary", "minified" or "generated" if the file head says so."""
+        try:
+            with open(os.path.join(self.repo_path, rel_path), "rb") as f:
+                head = f.read(SNIFF_BYTES)
+        except OSError:
+            return None
+
+        if b"\0" in head:
+            return "binary"
+
+        lines = head.split(b"\n")
+        # The last piece may be cut off by the sniff limit, so only judge complete lines
+        complete = lines[:-1] if len(head) == SNIFF_BYTES else lines
+        if not rel_path.endswith(PROSE_EXTENSIONS) and (
+            any(len(line) > self.minified_line_length for line in complete)
+            or (len(lines) == 1 and len(head) == SNIFF_BYTES)
+        ):
+            return "minified"
+
+        header = b"\n".join(lines[:HEADER_LINES]).decode("utf-8", errors="replace")
+        if any(p.search(header) for p in GENERATED_PATTERNS):
+            return "generated"
+        return None
+
+    def _is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        candidate = rel_path + "/" if is_dir else rel_path
+        if self.exclude.match_file(candidate):
+            return True
+
+        # Walk .gitignore files from the root down; deeper files override shallower ones
+        ignored = False
+        parts = rel_path.split("/")
+        for depth in range(len(parts)):
+            base = "/".join(parts[:depth])
+            spec = self._gitignore(base)
+            if spec is None:
+                continue
+            relative = "/".join(parts[depth:]) + ("/" if is_dir else "")
+            result = spec.check_file(relative)
+            if result.include is not None:
+                ignored = result.include
+        return ignored
+
+    def _gitignore(self, rel_dir: str) -> Optional[pathspec.GitIgnoreSpec]:
+        if rel_dir not in self._gitignores:
+            path = os.path.join(self.repo_path, rel_dir, ".gitignore")
+            try:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    self._gitignores[rel_dir] = pathspec.GitIgnoreSpec.from_lines(f)
+            except OSError:
+                self._gitignores[rel_dir] = None
+        return self._gitignores[rel_dir]
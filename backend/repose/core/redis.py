@@ -0,0 +1,24 @@
+import asyncio
+import weakref
+
+from redis.asyncio import Redis
+
+from repose.core.config import settings
+
+# Clients per event loop: redis.asyncio connections can't be shared across loops
+# (scripts and benchmarks use asyncio.run; Celery workers keep one loop per process)
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[bool, Redis]]" = weakref.WeakKeyDictionary()
+
+
+def get_redis(decode_responses: bool = True) -> Redis:
+    """
+    Shared async Redis client for the running event loop.
+    Pass decode_responses=False for binary values (e.g. packed vectors).
+    """
+    loop = asyncio.get_running_loop()
+    clients = _clients.setdefault(loop, {})
+    client = clients.get(decode_responses)
+    if client is None:
+        client = Redis.from_url(settings.REDIS_URL, decode_responses=decode_responses)
+        clients[decode_responses] = client
+    return client
@@ -0,0 +1,166 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repose.core.config import settings
+from repose.core.llm import LLMClient, Message
+from repose.core.llm.embedding_executor import estimate_tokens
+from repose.core.triage.service import TriageService, apply_analysis, issue_body, parse_json
+from repose.models.issue import Issue, TriageStatus
+
+BATCH_PROMPT = """You are an automated issue triage assistant.
+For EACH GitHub issue below provide:
+1. A concise summary (max 2 sentences).
+2. A priority level (LOW, MEDIUM, HIGH, CRITICAL).
+3. A list of relevant tags (max 5).
+
+{issues}
+
+Return your response in STRICT JSON format: an array with one object per issue,
+using the issue's ref number:
+[
+  {{"ref": 1, "summary": "...", "priority": "...", "tags": ["..."]}}
+]
+"""
+
+# Prompt text per issue besides title and body (ref header, field names)
+ISSUE_OVERHEAD_TOKENS = 20
+
+
+@dataclass
+class BatchTriageResult:
+    triaged: int = 0
+    failed: int = 0
+    # LLM calls made, including single-issue fallbacks
+    calls: int = 0
+    # Triaged issues set back to pending because they (or the prompt/model) changed
+    requeued: int = 0
+    # Pending issues whose last triage still matches their content; no LLM call
+    skipped: int = 0
+
+
+def _issue_block(ref: int, issue: Issue) -> str:
+    return f"### Issue ref {ref}\nTitle: {issue.title}\nBody:\n{issue_body(issue)}\n"
+
+
+class BatchTriageEngine:
+    """
+    Triages many issues with few LLM calls.
+    Short issues are packed into one prompt per batch (bounded by a token
+    budget and an issue count), batches run concurrently under a semaphore,
+    and the JSON answer is mapped back by ref. Issues a batch answer doesn't
+    cover (unparseable or missing entries) are retried one at a time;
+    throttled calls (429/503) back off and retry first.
+    Results are committed every commit_size issues. Issues whose
+    fingerprint matches their last triage are never sent again.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        llm_client: LLMClient,
+        token_budget: int = settings.TRIAGE_BATCH_TOKEN_BUDGET,
+        max_issues: int = settings.TRIAGE_BATCH_MAX_ISSUES,
+        concurrency: int = settings.TRIAGE_CONCURRENCY,
+        commit_size: int = settings.TRIAGE_COMMIT_SIZE
+    ):
+        self.db = db
+        self.llm = llm_client
+        self.service = TriageService(db, llm_client)
+        self.token_budget = token_budget
+        self.max_issues = max_issues
+        self.commit_size = commit_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def make_batches(self, issues: list[Issue]) -> list[list[Issue]]:
+        """Packs issues in order; an issue over the budget on its own gets a batch of one."""
+        batches: list[list[Issue]] = []
+        current: list[Issue] = []
+        current_tokens = estimate_tokens(BATCH_PROMPT)
+        for issue in issues:
+            size = estimate_tokens(issue.title) + estimate_tokens(issue_body(issue)) + ISSUE_OVERHEAD_TOKENS
+            if current and (current_tokens + size > self.token_budget or len(current) >= self.max_issues):
+                batches.append(current)
+                current, current_tokens = [], estimate_tokens(BATCH_PROMPT)
+            current.append(issue)
+            current_tokens += size
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _run_batch(self, batch: list[Issue], result: BatchTriageResult):
+        # Issues are only mutated in memory here; the session is used after gather()
+        async with self._semaphore:
+            if len(batch) == 1:
+                result.calls += 1
+                ok = await self.service.triage_issue(batch[0])
+                result.triaged += ok
+                result.failed += not ok
+                return
+
+            prompt = BATCH_PROMPT.format(issues="\n".join(_issue_block(ref, i) for ref, i in enumerate(batch, start=1)))
+            remaining = batch
+            try:
+                result.calls += 1
+                completion = await self.llm.complete_with_retry([Message(role="user", content=prompt)])
+            except Exception as e:
+                # Provider error that outlasted the backoff: retrying each issue would just multiply it
+                print(f"Error triaging batch of {len(batch)} issues: {e}")
+                result.failed += len(batch)
+                return
+
+            try:
+                analyses = parse_json(completion.content)
+                by_ref = {int(a["ref"]): a for a in analyses if isinstance(a, dict) and "ref" in a}
+                remaining = []
+                for ref, issue in enumerate(batch, start=1):
+                    if ref in by_ref:
+                        apply_analysis(issue, by_ref[ref], self.service.fingerprint(issue))
+                        result.triaged += 1
+                    else:
+                        remaining.append(issue)
+            except Exception as e:
+                print(f"Could not parse batch triage response ({e}); falling back to single issues")
+
+            for issue in remaining:
+                result.calls += 1
+                ok = await self.service.triage_issue(issue)
+                result.triaged += ok
+                result.failed += not ok
+
+    async def pending_issues(self, repo_id: Optional[UUID] = None) -> list[Issue]:
+        stmt = select(Issue).filter(
+            Issue.triage_status == TriageStatus.PENDING,
+            Issue.state == "open"
+        ).order_by(Issue.created_at)
+        if repo_id is not None:
+            stmt = stmt.filter(Issue.repo_id == repo_id)
+        result = await self.db.execute(stmt)
+        return result.scalars().all()
+
+    async def run(self, repo_id: Optional[UUID] = None) -> BatchTriageResult:
+        """
+        Triages every open pending issue (of one repo, or all), after
+        requeueing triaged issues whose fingerprint went stale.
+        """
+        result = BatchTriageResult()
+        result.requeued = await self.service.requeue_stale(repo_id)
+        await self.db.commit()
+
+        issues = []
+        for issue in await self.pending_issues(repo_id):
+            if self.service.is_current(issue):
+                # Reset to pending without any change since its last triage; keep that result
+                issue.triage_status = TriageStatus.TRIAGED
+                result.skipped += 1
+            else:
+                issues.append(issue)
+        for start in range(0, len(issues), self.commit_size):
+            group = issues[start:start + self.commit_size]
+            await asyncio.gather(*(self._run_batch(batch, result) for batch in self.make_batches(group)))
+            await self.db.commit()
+        return result
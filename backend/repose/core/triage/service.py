@@ -1,19 +1,95 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, func, literal
+import hashlib
 import json
+from typing import Any, Optional
+from uuid import UUID
 
 from repose.core.llm import LLMClient, Message
 from repose.models.issue import Issue, Priority, TriageStatus
 
+# Issue bodies past this are cut before prompting (stack traces, pasted logs)
+MAX_BODY_CHARS = 4000
+
+# Bump when the triage prompts (here or in batch.py) change meaningfully:
+# every triaged issue's fingerprint goes stale and it's triaged again
+TRIAGE_PROMPT_VERSION = "1"
+# Postgres text can't hold NUL, so fields are joined with the ASCII unit separator
+FINGERPRINT_SEPARATOR = "\x1f"
+
+
+def triage_fingerprint(issue: Issue, model: str) -> str:
+    """What a triage result depends on; must match triage_fingerprint_sql()."""
+    parts = [TRIAGE_PROMPT_VERSION, model, issue.title, issue.body or ""]
+    return hashlib.sha256(FINGERPRINT_SEPARATOR.join(parts).encode("utf-8")).hexdigest()
+
+
+def triage_fingerprint_sql(model: str):
+    """triage_fingerprint() computed in SQL over the issues row (needs Postgres 11+ for sha256)."""
+    joined = func.concat_ws(
+        literal(FINGERPRINT_SEPARATOR), literal(TRIAGE_PROMPT_VERSION), literal(model),
+        Issue.title, func.coalesce(Issue.body, "")
+    )
+    return func.encode(func.sha256(func.convert_to(joined, "UTF8")), "hex")
+
+
+def issue_body(issue: Issue) -> str:
+    body = issue.body or "No description provided."
+    if len(body) > MAX_BODY_CHARS:
+        body = body[:MAX_BODY_CHARS] + "\n[truncated]"
+    return body
+
+
+def parse_json(content: str) -> Any:
+    # Simple cleanup for JSON parsing if markdown blocks are included
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0].strip()
+    elif "```" in content:
+        content = content.split("```")[1].strip()
+    return json.loads(content)
+
+
+def apply_analysis(issue: Issue, analysis: dict[str, Any], fingerprint: str):
+    """Copies an LLM analysis onto the issue (doesn't commit)."""
+    issue.summary = analysis.get("summary")
+    
+    # Map priority
+    raw_prio = str(analysis.get("priority") or "medium").lower()
+    if "critical" in raw_prio: issue.priority = Priority.CRITICAL
+    elif "high" in raw_prio: issue.priority = Priority.HIGH
+    elif "low" in raw_prio: issue.priority = Priority.LOW
+    else: issue.priority = Priority.MEDIUM
+    
+    issue.tags = analysis.get("tags", [])
+    issue.triage_status = TriageStatus.TRIAGED
+    issue.triage_fingerprint = fingerprint
+
+
 class TriageService:
     def __init__(self, db: AsyncSession, llm_client: LLMClient):
         self.db = db
         self.llm = llm_client
 
-    async def analyze_issue(self, issue: Issue) -> Issue:
+    def fingerprint(self, issue: Issue) -> str:
+        return triage_fingerprint(issue, self.llm.config.model)
+
+    def is_current(self, issue: Issue) -> bool:
+        """True if the issue was triaged from its current content with the current prompt and model."""
+        return issue.triage_fingerprint is not None and issue.triage_fingerprint == self.fingerprint(issue)
+
+    async def analyze_issue(self, issue: Issue, force: bool = False) -> Issue:
         """
         Analyze an issue using LLM to determine priority, tags, and summary.
+        An issue already triaged from the same content is returned as is unless forced.
         """
+        if not force and issue.triage_status == TriageStatus.TRIAGED and self.is_current(issue):
+            return issue
+        if await self.triage_issue(issue):
+            await self.db.commit()
+        return issue
+
+    async def triage_issue(self, issue: Issue) -> bool:
+        """Single-issue analysis without committing; False if the LLM call or parsing failed."""
         prompt = f"""You are an automated issue triage assistant.
 Analyze the following GitHub issue and provide:
 1. A concise summary (max 2 sentences).
@@ -22,7 +98,7 @@ Analyze the following GitHub issue and provide:
 
 Issue Title: {issue.title}
 Issue Body:
-{issue.body or "No description provided."}
+{issue_body(issue)}
 
 Return your response in STRICT JSON format:
 {{
@@ -34,36 +110,30 @@ Return your response in STRICT JSON format:
         messages = [Message(role="user", content=prompt)]
         
         try:
-            result = await self.llm.complete(messages)
-            content = result.content
-            
-            # Simple cleanup for JSON parsing if markdown blocks are included
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].strip()
-                
-            analysis = json.loads(content)
-            
-            # Update issue
-            issue.summary = analysis.get("summary")
-            
-            # Map priority
-            raw_prio = analysis.get("priority", "medium").lower()
-            if "critical" in raw_prio: issue.priority = Priority.CRITICAL
-            elif "high" in raw_prio: issue.priority = Priority.HIGH
-            elif "low" in raw_prio: issue.priority = Priority.LOW
-            else: issue.priority = Priority.MEDIUM
-            
-            issue.tags = analysis.get("tags", [])
-            issue.triage_status = TriageStatus.TRIAGED
-            
-            await self.db.commit()
-            return issue
+            result = await self.llm.complete_with_retry(messages)
+            apply_analysis(issue, parse_json(result.content), self.fingerprint(issue))
+            return True
             
         except Exception as e:
             print(f"Error analyzing issue {issue.id}: {e}")
-            return issue
+            return False
+
+    async def requeue_stale(self, repo_id: Optional[UUID] = None) -> int:
+        """
+        Sets open triaged issues back to pending when their title/body changed
+        or the prompt version or model did (fingerprint compared in SQL).
+        Ignored issues stay ignored, and closed ones keep their last triage
+        (only open issues are picked up again).
+        """
+        stmt = update(Issue).where(
+            Issue.triage_status == TriageStatus.TRIAGED,
+            Issue.state == "open",
+            Issue.triage_fingerprint.is_distinct_from(triage_fingerprint_sql(self.llm.config.model))
+        ).values(triage_status=TriageStatus.PENDING)
+        if repo_id is not None:
+            stmt = stmt.where(Issue.repo_id == repo_id)
+        result = await self.db.execute(stmt)
+        return result.rowcount
 
     async def get_pending_issues(self) -> list[Issue]:
         stmt = select(Issue).filter(Issue.triage_status == TriageStatus.PENDING)
@@ -0,0 +1,59 @@
+import asyncio
+from dataclasses import dataclass, field
+
+
+class GitError(Exception):
+    pass
+
+
+@dataclass
+class FileChanges:
+    """Files touched between two commits, relative to the repo root."""
+    changed: list[str] = field(default_factory=list)  # added or modified
+    deleted: list[str] = field(default_factory=list)
+
+
+async def _run_git(repo_path: str, *args: str) -> str:
+    proc = await asyncio.create_subprocess_exec(
+        "git", "-C", repo_path, *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise GitError(f"git {' '.join(args)} failed: {stderr.decode(errors='replace').strip()}")
+    return stdout.decode("utf-8", errors="surrogateescape")
+
+
+async def get_head_sha(repo_path: str) -> str:
+    return (await _run_git(repo_path, "rev-parse", "HEAD")).strip()
+
+
+async def commit_exists(repo_path: str, sha: str) -> bool:
+    try:
+        await _run_git(repo_path, "cat-file", "-e", f"{sha}^{{commit}}")
+        return True
+    except GitError:
+        return False
+
+
+async def diff_files(repo_path: str, base_sha: str, head_sha: str) -> FileChanges:
+    """
+    Lists files changed between base_sha and head_sha.
+    Renames are reported as a delete of the old path plus an add of the new one.
+    """
+    output = await _run_git(
+        repo_path, "diff", "--name-status", "--no-renames", "-z", base_sha, head_sha
+    )
+    changes = FileChanges()
+    # -z output is "<status>\0<path>\0" repeated
+    parts = output.split("\0")
+    for status, path in zip(parts[0::2], parts[1::2]):
+        if not status:
+            continue
+        if status.startswith("D"):
+            changes.deleted.append(path)
+        else:
+            # A, M, T (type change)
+            changes.changed.append(path)
+    return changes
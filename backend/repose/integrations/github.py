@@ -1,13 +1,70 @@
+import asyncio
+import importlib.util
+import weakref
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional, Any
+from urllib.parse import parse_qs, urlparse
+
 import httpx
-from typing import Optional, Any
+
 from repose.core.config import settings
+from repose.integrations.github_cache import (
+    CACHED_HEADERS, CachedResponse, ConditionalCache, cache_key, get_conditional_cache, token_scope
+)
+from repose.integrations.github_rate_limit import GitHubRateLimitError, RateLimitScheduler
+
+BASE_URL = "https://api.github.com"
+# GitHub's maximum page size for list endpoints
+MAX_PER_PAGE = 100
+# Re-sends of a request that came back rate-limited
+RATE_LIMIT_RETRIES = 3
+
+# HTTP/2 multiplexes concurrent requests over one connection; needs the optional h2 package
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+# One pooled client per event loop (httpx connections are bound to the loop that opened them)
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=BASE_URL,
+            http2=HTTP2,
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.GITHUB_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GITHUB_MAX_CONNECTIONS,
+            ),
+        )
+        _http_clients[loop] = client
+    return client
+
+
+async def close_http_client():
+    """Closes the running loop's pooled client (app / worker shutdown)."""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
 
 
 class GitHubClient:
-    BASE_URL = "https://api.github.com"
+    BASE_URL = BASE_URL
     
-    def __init__(self, token: Optional[str] = None):
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        cache: Optional[ConditionalCache] = None,
+        priority: str = "background"
+    ):
         self.token = token
+        # Cheap to construct: connections live in the shared pool, not here
+        self.cache = cache if cache is not None else get_conditional_cache()
+        # "interactive" for requests a user is waiting on; they go ahead of background sync
+        self.priority = priority
+        self.scheduler = RateLimitScheduler() if settings.GITHUB_RATE_LIMIT_ENABLED else None
         self.headers = {
             "Accept": "application/vnd.github.v3+json",
             "User-Agent": "Repose-App"
@@ -15,51 +72,163 @@ class GitHubClient:
         if self.token:
             self.headers["Authorization"] = f"Bearer {self.token}"
 
+    async def _get(self, path: str, params: Optional[dict[str, Any]] = None) -> httpx.Response:
+        """
+        Conditional GET. A stored ETag/Last-Modified is sent as If-None-Match /
+        If-Modified-Since; a 304 (which GitHub doesn't count against the rate
+        limit) is answered from the cache as a normal 200 response.
+        """
+        client = get_http_client()
+        request = client.build_request("GET", path, params=params, headers=self.headers)
+        key = cache_key(str(request.url), self.token)
+
+        cached = await self.cache.get(key) if self.cache else None
+        if cached:
+            if cached.etag:
+                request.headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                request.headers["If-Modified-Since"] = cached.last_modified
+
+        response = await self._send(client, request)
+        if response.status_code == 304 and cached:
+            headers = {**cached.headers, **{k: v for k, v in response.headers.items() if k.startswith("x-ratelimit")}}
+            return httpx.Response(200, headers=headers, content=cached.body.encode("utf-8"), request=request)
+
+        if self.cache and response.status_code == 200:
+            etag = response.headers.get("etag")
+            last_modified = response.headers.get("last-modified")
+            if etag or last_modified:
+                await self.cache.put(key, CachedResponse(
+                    etag=etag,
+                    last_modified=last_modified,
+                    headers={h: response.headers[h] for h in CACHED_HEADERS if h in response.headers},
+                    body=response.text,
+                ))
+        return response
+
+    async def _send(self, client: httpx.AsyncClient, request: httpx.Request) -> httpx.Response:
+        """Sends under a rate-limit permit, re-sending (after the wait) if GitHub rate-limits it."""
+        if self.scheduler is None:
+            return await client.send(request)
+
+        scope = token_scope(self.token)
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await self.scheduler.acquire(scope, self.priority)
+            response = await client.send(request)
+            retry_after = await self.scheduler.observe(scope, response)
+            if retry_after is None or attempt == RATE_LIMIT_RETRIES:
+                break
+            if self.priority == "interactive" and retry_after > self.scheduler.interactive_max_wait:
+                raise GitHubRateLimitError(retry_after)
+            print(f"GitHub rate limited {request.url.path}, retrying in {retry_after:.0f}s")
+            # The block is now in Redis; the next acquire() waits it out
+        return response
+
     async def get_repo_metadata(self, owner: str, repo: str) -> dict[str, Any]:
         """
         Fetch repository metadata from GitHub API.
         """
-        async with httpx.AsyncClient(base_url=self.BASE_URL, headers=self.headers) as client:
-            response = await client.get(f"/repos/{owner}/{repo}")
-            if response.status_code == 404:
-                raise Exception(f"Repository {owner}/{repo} not found")
-            response.raise_for_status()
-            return response.json()
+        response = await self._get(f"/repos/{owner}/{repo}")
+        if response.status_code == 404:
+            raise Exception(f"Repository {owner}/{repo} not found")
+        response.raise_for_status()
+        return response.json()
+
+    async def paginate(
+        self,
+        path: str,
+        params: Optional[dict[str, Any]] = None,
+        concurrency: int = settings.GITHUB_PAGE_CONCURRENCY
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Yields every item of a paginated list endpoint, in page order.
+        The first response's Link rel="last" gives the page count; the
+        remaining pages are then fetched concurrently (at most `concurrency`
+        in flight). Endpoints that only advertise rel="next" are walked
+        one page at a time.
+        """
+        params = {"per_page": MAX_PER_PAGE, **(params or {})}
+        response = await self._get(path, params=params)
+        response.raise_for_status()
+        for item in response.json():
+            yield item
+
+        last = response.links.get("last", {}).get("url")
+        if last is None:
+            next_url = response.links.get("next", {}).get("url")
+            while next_url:
+                response = await self._get(next_url)
+                response.raise_for_status()
+                for item in response.json():
+                    yield item
+                next_url = response.links.get("next", {}).get("url")
+            return
+
+        last_page = int(parse_qs(urlparse(last).query)["page"][0])
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _page(page: int) -> list[dict[str, Any]]:
+            async with semaphore:
+                page_response = await self._get(path, params={**params, "page": page})
+                page_response.raise_for_status()
+                return page_response.json()
+
+        tasks = [asyncio.create_task(_page(page)) for page in range(2, last_page + 1)]
+        try:
+            for task in tasks:
+                for item in await task:
+                    yield item
+        finally:
+            # Consumer stopped early or a page failed
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def iter_repository_issues(
+        self,
+        owner: str,
+        repo: str,
+        state: str = "open",
+        since: Optional[datetime] = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Stream a repository's issues, all pages; with `since`, only issues
+        updated at or after it. Note GitHub lists pull requests here too
+        (they carry a "pull_request" key).
+        """
+        params = {"state": state}
+        if since is not None:
+            params["since"] = since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return self.paginate(f"/repos/{owner}/{repo}/issues", params=params)
 
     async def get_repository_issues(self, owner: str, repo: str) -> list[dict[str, Any]]:
         """
         Fetch issues from GitHub API.
         """
-        async with httpx.AsyncClient(base_url=self.BASE_URL, headers=self.headers) as client:
-            # Filter for open issues only for now
-            response = await client.get(f"/repos/{owner}/{repo}/issues?state=open")
-            response.raise_for_status()
-            return response.json()
+        # Filter for open issues only for now
+        return [issue async for issue in self.iter_repository_issues(owner, repo)]
 
     async def get_user_repos(self, username: str) -> list[dict[str, Any]]:
         """
         Fetch repositories for a user.
         """
-        async with httpx.AsyncClient(base_url=self.BASE_URL, headers=self.headers) as client:
-            # If we are authenticated and the username matches, we could technically use /user/repos
-            # But adhering to the specific user request to use GITHUB_USERNAME
-            # However, /users/{username}/repos returns public repos.
-            # If we want private repos, we must use /user/repos and be authenticated as that user.
-            # The prompt says "backend will use GITHUB_PAT to fetch all personal repos owned by user (GITHUB_USERNAME)"
-            # Let's try to support both. If we have a token, we might see more.
-            # actually, let's use /users/{username}/repos for now as requested, but if the token is for that user, it might show private?
-            # actually no, /users/:username/repos only shows public unless you are that user AND using /user/repos endpoint usually?
-            # Wait, GitHub API: "List repositories for a user" GET /users/{username}/repos.
-            # "List repositories for the authenticated user" GET /user/repos.
-            # The prompt specifically says "fetch all personal repos owned by user (GITHUB_USERNAME)".
-            # If I stick to /users/{username}/repos I might miss private Repos if the PAT allows it but the endpoint doesn't.
-            # Let's use /user/repos if the configured username matches the requests, OR just rely on /users/{username}/repos for simplicity first as per prompt.
-            # Actually, standard practice: if I want "my" repos, I use /user/repos.
-            # But the prompt says "owned by user (GITHUB_USERNAME)".
-            # Let's implement getting repos for the specific username.
-            
-            # Using query params to get all types (owner)
-            params = {"type": "owner", "sort": "updated", "per_page": 100}
-            response = await client.get(f"/users/{username}/repos", params=params)
-            response.raise_for_status()
-            return response.json()
+        # If we are authenticated and the username matches, we could technically use /user/repos
+        # But adhering to the specific user request to use GITHUB_USERNAME
+        # However, /users/{username}/repos returns public repos.
+        # If we want private repos, we must use /user/repos and be authenticated as that user.
+        # The prompt says "backend will use GITHUB_PAT to fetch all personal repos owned by user (GITHUB_USERNAME)"
+        # Let's try to support both. If we have a token, we might see more.
+        # actually, let's use /users/{username}/repos for now as requested, but if the token is for that user, it might show private?
+        # actually no, /users/:username/repos only shows public unless you are that user AND using /user/repos endpoint usually?
+        # Wait, GitHub API: "List repositories for a user" GET /users/{username}/repos.
+        # "List repositories for the authenticated user" GET /user/repos.
+        # The prompt specifically says "fetch all personal repos owned by user (GITHUB_USERNAME)".
+        # If I stick to /users/{username}/repos I might miss private Repos if the PAT allows it but the endpoint doesn't.
+        # Let's use /user/repos if the configured username matches the requests, OR just rely on /users/{username}/repos for simplicity first as per prompt.
+        # Actually, standard practice: if I want "my" repos, I use /user/repos.
+        # But the prompt says "owned by user (GITHUB_USERNAME)".
+        # Let's implement getting repos for the specific username.
+        
+        # Using query params to get all types (owner)
+        params = {"type": "owner", "sort": "updated"}
+        return [repo async for repo in self.paginate(f"/users/{username}/repos", params=params)]
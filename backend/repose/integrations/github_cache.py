@@ -0,0 +1,102 @@
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from repose.core.config import settings
+from repose.core.redis import get_redis
+
+# Response headers replayed when a 304 is served from the cache
+CACHED_HEADERS = ("etag", "last-modified", "link", "content-type")
+
+
+@dataclass
+class CachedResponse:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    headers: dict[str, str]
+    body: str
+
+
+def token_scope(token: Optional[str]) -> str:
+    # Stable id for a token that doesn't put the token itself in Redis
+    return hashlib.sha256((token or "").encode("utf-8")).hexdigest()[:16]
+
+
+def cache_key(url: str, token: Optional[str]) -> str:
+    # Different tokens can see different data for the same URL
+    return f"{token_scope(token)}:{url}"
+
+
+class ConditionalCache(ABC):
+    """Stores validators and bodies of GitHub GET responses, keyed by URL."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        pass
+
+    @abstractmethod
+    async def put(self, key: str, entry: CachedResponse):
+        pass
+
+
+class MemoryConditionalCache(ConditionalCache):
+    """Process-local LRU; fine for a single API process or tests."""
+
+    def __init__(self, maxsize: int = settings.GITHUB_CACHE_MEMORY_SIZE):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, CachedResponse] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    async def put(self, key: str, entry: CachedResponse):
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+class RedisConditionalCache(ConditionalCache):
+    """Shared by the API and every Celery worker."""
+
+    KEY_PREFIX = "repose:github:http:"
+
+    def __init__(self, ttl_seconds: int = settings.GITHUB_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        try:
+            data = await get_redis().get(self.KEY_PREFIX + key)
+        except Exception as e:
+            print(f"Error reading GitHub cache: {e}")
+            return None
+        return CachedResponse(**json.loads(data)) if data else None
+
+    async def put(self, key: str, entry: CachedResponse):
+        try:
+            await get_redis().set(self.KEY_PREFIX + key, json.dumps(asdict(entry)), ex=self.ttl_seconds)
+        except Exception as e:
+            print(f"Error writing GitHub cache: {e}")
+
+
+_memory_cache: Optional[MemoryConditionalCache] = None
+
+
+def get_conditional_cache(backend: str = settings.GITHUB_CACHE_BACKEND) -> Optional[ConditionalCache]:
+    global _memory_cache
+    if backend == "redis":
+        return RedisConditionalCache()
+    if backend == "memory":
+        # One per process, otherwise every GitHubClient would start cold
+        if _memory_cache is None:
+            _memory_cache = MemoryConditionalCache()
+        return _memory_cache
+    if backend == "none":
+        return None
+    raise ValueError(f"Unknown GITHUB_CACHE_BACKEND: {backend}")
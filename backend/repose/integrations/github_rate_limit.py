@@ -0,0 +1,172 @@
+import asyncio
+import time
+from typing import Optional
+
+import httpx
+
+from repose.core.config import settings
+from repose.core.redis import get_redis
+
+PRIORITIES = ("interactive", "background")
+
+# Longest single sleep while waiting for a permit, so a freed budget is noticed promptly
+MAX_SLEEP_SECONDS = 5.0
+
+# Returns the seconds to wait (as a string; Lua numbers become ints), "0" = permit granted.
+# State per token: remaining/reset from GitHub's headers, blocked_until from
+# Retry-After, and a token bucket (tokens, ts) pacing background requests.
+ACQUIRE = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local priority = ARGV[2]
+local reserve = tonumber(ARGV[3])
+local burst = tonumber(ARGV[4])
+
+local s = redis.call('HMGET', key, 'remaining', 'reset', 'blocked_until', 'tokens', 'ts')
+local remaining = tonumber(s[1])
+local reset = tonumber(s[2]) or 0
+local blocked_until = tonumber(s[3]) or 0
+if blocked_until > now then
+    return tostring(blocked_until - now)
+end
+if remaining == nil or now >= reset then
+    -- Budget unknown or the window has rolled over: go, GitHub's headers will tell us
+    return '0'
+end
+
+local tokens = tonumber(s[4]) or burst
+if priority == 'background' then
+    local spendable = remaining - reserve
+    if spendable <= 0 then
+        return tostring(reset - now)
+    end
+    -- Refill so the spendable budget lasts until the reset
+    local rate = spendable / math.max(reset - now, 1)
+    local ts = tonumber(s[5]) or now
+    tokens = math.min(burst, tokens + math.max(now - ts, 0) * rate)
+    if tokens < 1 then
+        redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+        return tostring((1 - tokens) / rate)
+    end
+    tokens = tokens - 1
+elseif remaining <= 0 then
+    return tostring(reset - now)
+end
+
+redis.call('HSET', key, 'remaining', remaining - 1, 'tokens', tokens, 'ts', now)
+return '0'
+"""
+
+# GitHub's reported remaining is the truth: ACQUIRE's decrements are only an estimate
+# between responses, and 304s (which don't count) would otherwise ratchet it down for
+# good. Responses from an older window than the stored one are ignored.
+OBSERVE = """
+local key = KEYS[1]
+local remaining = tonumber(ARGV[1])
+local reset = tonumber(ARGV[2])
+local blocked_until = tonumber(ARGV[3])
+
+if remaining ~= nil and reset ~= nil then
+    local stored_reset = tonumber(redis.call('HGET', key, 'reset')) or 0
+    if reset >= stored_reset then
+        redis.call('HSET', key, 'remaining', remaining, 'reset', reset)
+        redis.call('EXPIREAT', key, reset + 3600)
+    end
+end
+if blocked_until ~= nil then
+    local current = tonumber(redis.call('HGET', key, 'blocked_until')) or 0
+    if blocked_until > current then
+        redis.call('HSET', key, 'blocked_until', blocked_until)
+        redis.call('EXPIREAT', key, math.ceil(blocked_until) + 3600)
+    end
+end
+return 1
+"""
+
+
+class GitHubRateLimitError(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"GitHub rate limit reached, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def _blocked_until(response: httpx.Response, now: float) -> Optional[float]:
+    """When a rate-limited response says we may try again (None if it isn't rate-limited)."""
+    if response.status_code not in (403, 429):
+        return None
+    retry_after = response.headers.get("retry-after")
+    if retry_after is not None:
+        # Secondary (abuse) limit
+        return now + float(retry_after)
+    if response.headers.get("x-ratelimit-remaining") == "0":
+        return float(response.headers.get("x-ratelimit-reset", now + 60))
+    if response.status_code == 429:
+        return now + 60
+    # A plain 403 (permissions) isn't a rate limit
+    return None
+
+
+class RateLimitScheduler:
+    """
+    Hands out GitHub request permits per token, shared by the API and every
+    Celery worker through Redis. Background requests are paced so a token's
+    budget lasts until its reset and stop RESERVE requests short of zero;
+    interactive requests skip the pacing and may spend the reserve.
+    Redis errors fail open (the request just goes ahead).
+    """
+
+    KEY_PREFIX = "repose:github:ratelimit:"
+
+    def __init__(
+        self,
+        reserve: int = settings.GITHUB_RATE_LIMIT_RESERVE,
+        burst: int = settings.GITHUB_RATE_LIMIT_BURST,
+        interactive_max_wait: float = settings.GITHUB_INTERACTIVE_MAX_WAIT_SECONDS
+    ):
+        self.reserve = reserve
+        self.burst = burst
+        self.interactive_max_wait = interactive_max_wait
+
+    async def acquire(self, scope: str, priority: str):
+        """
+        Waits for a permit. Interactive callers get GitHubRateLimitError
+        instead of waiting longer than interactive_max_wait.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        waited = 0.0
+        while True:
+            try:
+                wait = float(await get_redis().eval(
+                    ACQUIRE, 1, self.KEY_PREFIX + scope, time.time(), priority, self.reserve, self.burst
+                ))
+            except Exception as e:
+                print(f"Error acquiring GitHub rate-limit permit: {e}")
+                return
+            if wait <= 0:
+                return
+            if priority == "interactive" and waited + wait > self.interactive_max_wait:
+                raise GitHubRateLimitError(wait)
+            sleep = min(wait, MAX_SLEEP_SECONDS)
+            await asyncio.sleep(sleep)
+            waited += sleep
+
+    async def observe(self, scope: str, response: httpx.Response) -> Optional[float]:
+        """
+        Records the budget GitHub reported. Returns the seconds until a retry
+        is allowed if the response was rate-limited, else None.
+        """
+        now = time.time()
+        blocked_until = _blocked_until(response, now)
+        remaining = response.headers.get("x-ratelimit-remaining")
+        reset = response.headers.get("x-ratelimit-reset")
+        if remaining is None or reset is None:
+            remaining = reset = ""
+        try:
+            await get_redis().eval(
+                OBSERVE, 1, self.KEY_PREFIX + scope,
+                remaining, reset, "" if blocked_until is None else blocked_until
+            )
+        except Exception as e:
+            print(f"Error recording GitHub rate limit: {e}")
+        return None if blocked_until is None else max(blocked_until - now, 0.0)
@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI
 from dotenv import load_dotenv
@@ -6,11 +8,30 @@ load_dotenv(backend_dir / '.env')
 
 from repose.core.config import settings
 from repose.api.api import api_router
+from repose.core.llm import LLMClientRegistry
 from repose.core.middleware import MetricsMiddleware
+from repose.core.rag import local_index
+from repose.integrations.github import close_http_client
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared LLM clients (and their connection pools) for every request
+    app.state.llm_registry = LLMClientRegistry()
+    
+    # Warm in the background so startup isn't held up by network round-trips or page faults
+    warm_tasks = [asyncio.create_task(app.state.llm_registry.warm_up([settings.CHAT_MODEL, settings.TRIAGE_MODEL]))]
+    if settings.RETRIEVAL_BACKEND == "local":
+        warm_tasks.append(asyncio.create_task(local_index.warm_hot_repos()))
+    yield
+    for task in warm_tasks:
+        task.cancel()
+    await app.state.llm_registry.aclose()
+    await close_http_client()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 app.add_middleware(MetricsMiddleware)
@@ -24,3 +45,8 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+@app.get("/health/llm")
+async def llm_health_check():
+    clients = await app.state.llm_registry.health()
+    return {"status": "ok" if all(clients.values()) else "degraded", "clients": clients}
@@ -1,6 +1,7 @@
 from .repository import Repository
 from .metrics import SystemMetrics
 from .embedding import CodeEmbedding
+from .embedding_cache import EmbeddingCacheEntry
 from .agent_event import AgentEvent
 from .issue import Issue
 from repose.db.base_class import Base
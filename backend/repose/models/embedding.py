@@ -1,15 +1,54 @@
 import uuid
 
-from sqlalchemy import Column, String, Integer, Text, ForeignKey, TIMESTAMP
+from sqlalchemy import Column, String, Integer, Text, ForeignKey, TIMESTAMP, UniqueConstraint, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import mapped_column
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
 from sqlalchemy.sql import func
 
 from repose.db.base_class import Base
 
 class CodeEmbedding(Base):
     __tablename__ = "code_embeddings"
+    __table_args__ = (
+        # Upsert target for (re-)indexing
+        UniqueConstraint("repo_id", "file_path", "chunk_index", name="uq_code_embeddings_repo_file_chunk"),
+        # Approximate nearest-neighbour search for retrieval
+        Index(
+            "ix_code_embeddings_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        # Same for the compact storage modes (see core/rag/storage.py); NULLs aren't indexed
+        Index(
+            "ix_code_embeddings_embedding_half_hnsw",
+            "embedding_half",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding_half": "halfvec_cosine_ops"},
+        ),
+        Index(
+            "ix_code_embeddings_embedding_bits_hnsw",
+            "embedding_bits",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding_bits": "bit_hamming_ops"},
+        ),
+        # Lexical search (core/rag/lexical.py): substring lookups and full-text word matches
+        Index(
+            "ix_code_embeddings_content_trgm",
+            "content",
+            postgresql_using="gin",
+            postgresql_ops={"content": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_code_embeddings_content_tsv",
+            text("to_tsvector('simple', content)"),
+            postgresql_using="gin",
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     repo_id = Column(UUID(as_uuid=True), ForeignKey("repositories.id", ondelete="CASCADE"), nullable=False)
@@ -21,6 +60,9 @@ class CodeEmbedding(Base):
     content = Column(Text, nullable=False)
     # Gemini embedding dimension is 1536 for text-embedding-004
     embedding = mapped_column(Vector(1536))
+    # Only one layout is populated per row, depending on EMBEDDING_STORAGE
+    embedding_half = mapped_column(HALFVEC(1536))
+    embedding_bits = mapped_column(BIT(1536))
     
     language = Column(String(50))
     start_line = Column(Integer)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, Integer, TIMESTAMP
+from sqlalchemy.orm import mapped_column
+from pgvector.sqlalchemy import Vector
+from sqlalchemy.sql import func
+
+from repose.db.base_class import Base
+
+class EmbeddingCacheEntry(Base):
+    """
+    Content-addressed embedding store shared by every repository.
+    Rows are keyed by (model, dimensions, chunk_hash) so identical chunks in
+    forks, re-syncs or other repos never hit the embedding API twice.
+    """
+    __tablename__ = "embedding_cache"
+
+    model = Column(String(100), primary_key=True)
+    dimensions = Column(Integer, primary_key=True)
+    chunk_hash = Column(String(64), primary_key=True)
+
+    # Unconstrained vector so the cache can hold any model's dimensionality
+    embedding = mapped_column(Vector(), nullable=False)
+
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Text, ForeignKey, TIMESTAMP, JSON, Enum
+from sqlalchemy import Column, String, Integer, BigInteger, Text, ForeignKey, TIMESTAMP, JSON, Enum, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 import enum
@@ -18,11 +18,15 @@ class TriageStatus(str, enum.Enum):
 
 class Issue(Base):
     __tablename__ = "issues"
+    __table_args__ = (
+        # Upsert target for issue sync
+        UniqueConstraint("repo_id", "number", name="uq_issues_repo_number"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     repo_id = Column(UUID(as_uuid=True), ForeignKey("repositories.id", ondelete="CASCADE"), nullable=False)
     
-    github_id = Column(Integer, nullable=True) # ID from GitHub
+    github_id = Column(BigInteger, nullable=True) # ID from GitHub (past 2^31 these days)
     number = Column(Integer, nullable=False)
     title = Column(String, nullable=False)
     body = Column(Text, nullable=True)
@@ -34,6 +38,8 @@ class Issue(Base):
     priority = Column(String, nullable=True)
     tags = Column(JSON, nullable=True) # List of strings
     summary = Column(Text, nullable=True)
+    # sha256 of title, body, prompt version and model at the last triage (see core/triage/service.py)
+    triage_fingerprint = Column(String(64), nullable=True)
     
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), onupdate=func.now())
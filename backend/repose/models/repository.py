@@ -19,6 +19,9 @@ class Repository(Base):
     last_commit_at = Column(DateTime(timezone=True))
     last_sync_at = Column(DateTime(timezone=True))
     sync_status = Column(String(20), default="pending")
+    # Issue sync: newest GitHub updated_at applied (the next `since`), and last full pass
+    issues_synced_until = Column(DateTime(timezone=True))
+    issues_reconciled_at = Column(DateTime(timezone=True))
     
     # Configuration
     is_active = Column(Boolean, default=True)
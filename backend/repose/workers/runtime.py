@@ -0,0 +1,43 @@
+import asyncio
+from typing import Awaitable, Optional, TypeVar
+
+from celery.signals import worker_process_shutdown
+
+from repose.core.llm import LLMClient, LLMClientRegistry
+from repose.core.rag.parallel_chunking import shutdown_pool
+from repose.integrations.github import close_http_client
+
+T = TypeVar("T")
+
+# One loop and one set of LLM / GitHub clients per worker process. asyncio.run()
+# per task would tear down the loop, and every client's connection pool with it.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_llm_registry = LLMClientRegistry()
+
+
+def run_async(coro: Awaitable[T]) -> T:
+    """Runs a coroutine on the worker process's persistent event loop."""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coro)
+
+
+def get_llm_client(model: str) -> LLMClient:
+    return _llm_registry.get(model)
+
+
+@worker_process_shutdown.connect
+def _shutdown(**kwargs):
+    global _loop
+    shutdown_pool()
+    if _loop is None or _loop.is_closed():
+        return
+    try:
+        _loop.run_until_complete(_llm_registry.aclose())
+        _loop.run_until_complete(close_http_client())
+        _loop.run_until_complete(_loop.shutdown_asyncgens())
+    finally:
+        _loop.close()
+        _loop = None
@@ -1,10 +1,11 @@
-import asyncio
 from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID
 
 from sqlalchemy import select
-from sqlalchemy.dialects.postgresql import insert
 
 from repose.core.celery_app import celery_app
+from repose.workers.runtime import run_async, get_llm_client
 
 
 @celery_app.task(acks_late=True)
@@ -70,12 +71,12 @@ def sync_repository(repo_id: str):
                 raise e
 
     try:
-        asyncio.run(_sync())
+        run_async(_sync())
     except Exception as e:
         print(f"Sync task failed: {e}")
         # If _sync raised, it's already caught internally unless it was during commit or setup
         # But we re-raised in except block above so Celery knows it failed.
-        # But wait, asyncio.run will raise the exception.
+        # But wait, run_async will raise the exception.
         # So we should probably catch it to ensure we don't crash the worker purely (though celery handles it)
         pass 
 
@@ -84,15 +85,17 @@ def sync_repository(repo_id: str):
 
 
 @celery_app.task(acks_late=True)
-def sync_repo_issues(repo_id: str):
+def sync_repo_issues(repo_id: str, full: Optional[bool] = None):
     """
     Sync issues for a repository.
+    Incremental (issues changed since the last sync) unless a full
+    reconciliation is due or forced with full=True.
     """
     from repose.db.session import AsyncSessionLocal
     from repose.models.repository import Repository
-    from repose.models.issue import Issue
     from repose.integrations.github import GitHubClient
     from repose.core.config import settings
+    from repose.core.issues.sync import sync_repository_issues
     
     async def _sync_issues():
         async with AsyncSessionLocal() as db:
@@ -102,68 +105,96 @@ def sync_repo_issues(repo_id: str):
             repo = result.scalars().first()
             if not repo:
                 print(f"Repo {repo_id} not found")
-                return
+                return None
 
-            client = GitHubClient(token=settings.GITHUB_APP_PRIVATE_KEY)
-            # Assuming repo.name is "owner/repo"
+            client = GitHubClient(token=settings.GITHUB_PAT)
             try:
-                owner, name = repo.name.split("/")
-                issues = await client.get_repository_issues(owner, name)
-                
-                for i_data in issues:
-                    if "pull_request" in i_data: continue # Skip PRs
-                    
-                    stmt = insert(Issue).values(
-                        repo_id=repo_id,
-                        github_id=i_data["id"],
-                        number=i_data["number"],
-                        title=i_data["title"],
-                        body=i_data["body"] or "",
-                        state=i_data["state"],
-                        html_url=i_data["html_url"],
-                        # triage_status defaults to pending
-                    )
-                    # Upsert
-                    stmt = stmt.on_conflict_do_update(
-                        index_elements=['repo_id', 'number'], # Assumes unique constraint on repo_id+number (need to ensure this in DB/Migration ideally, or fallback to PK)
-                        # Actually we don't have that constraint in the migration explicitly, usually github_id is unique globally, or repo_id+number.
-                        # For now, let's just use github_id if possible or just update fields.
-                        # For simplicity in this demo without complex unique constraints:
-                        # We will try to find existing issue by number first.
-                        set_={
-                            'title': stmt.excluded.title,
-                            'body': stmt.excluded.body,
-                            'state': stmt.excluded.state
-                        }
-                    )
-                    # Note: Upsert with just 'repo_id' and 'number' as index_elements works ONLY if there is a unique constraint.
-                    # Since we didn't add one in the manual migration, we should check existence manually or catch error.
-                    # Let's do manual check for safety.
-                    
-                    existing_stmt = select(Issue).filter(Issue.repo_id==repo_id, Issue.number==i_data["number"])
-                    existing = await db.execute(existing_stmt)
-                    existing_issue = existing.scalars().first()
-                    
-                    if existing_issue:
-                        existing_issue.title = i_data["title"]
-                        existing_issue.body = i_data["body"]
-                        existing_issue.state = i_data["state"]
-                    else:
-                        db.add(Issue(
-                            repo_id=repo_id,
-                            github_id=i_data["id"],
-                            number=i_data["number"],
-                            title=i_data["title"],
-                            body=i_data["body"] or "",
-                            state=i_data["state"],
-                            html_url=i_data["html_url"]
-                        ))
-                
-                await db.commit()
-                print(f"Synced {len(issues)} issues for {repo.name}")
+                synced = await sync_repository_issues(db, client, repo, full=full)
+                print(
+                    f"Synced {synced.fetched} issues for {repo.full_name} "
+                    f"({synced.mode}: {synced.written} written, {synced.closed} closed)"
+                )
+                return synced
 
             except Exception as e:
                 print(f"Error syncing issues for {repo_id}: {e}")
+                return None
+
+    synced = run_async(_sync_issues())
+    if synced is None:
+        return {"status": "failed", "repo_id": repo_id}
+    if settings.TRIAGE_AFTER_SYNC:
+        triage_pending_issues.delay(repo_id)
+    return {
+        "status": "completed",
+        "repo_id": repo_id,
+        "mode": synced.mode,
+        "fetched": synced.fetched,
+        "written": synced.written,
+        "closed": synced.closed,
+    }
+
+
+@celery_app.task(acks_late=True)
+def triage_pending_issues(repo_id: Optional[str] = None):
+    """
+    Batch-triage open pending issues (of one repo, or all repos).
+    Queued after every issue sync.
+    """
+    from repose.core.config import settings
+    from repose.core.triage.batch import BatchTriageEngine
+    from repose.db.session import AsyncSessionLocal
+
+    async def _triage():
+        async with AsyncSessionLocal() as db:
+            engine = BatchTriageEngine(db, get_llm_client(settings.TRIAGE_MODEL))
+            return await engine.run(UUID(repo_id) if repo_id else None)
+
+    triaged = run_async(_triage())
+    print(
+        f"Triaged {triaged.triaged} issues for repo_id {repo_id} in {triaged.calls} LLM calls "
+        f"({triaged.failed} failed, {triaged.requeued} requeued, {triaged.skipped} unchanged)"
+    )
+    return {
+        "status": "completed",
+        "repo_id": repo_id,
+        "triaged": triaged.triaged,
+        "failed": triaged.failed,
+        "calls": triaged.calls,
+        "requeued": triaged.requeued,
+        "skipped": triaged.skipped,
+    }
+
+
+@celery_app.task(acks_late=True)
+def index_repository(repo_id: str, repo_path: str):
+    """
+    Incrementally re-index a local clone of a repository.
+    Only files changed since Repository.last_commit_sha are re-embedded.
+    """
+    from repose.core.config import settings
+    from repose.core.rag import local_index
+    from repose.core.rag.context_engine import ContextEngine
+    from repose.db.session import AsyncSessionLocal
+    from repose.models.repository import Repository
+
+    async def _index():
+        async with AsyncSessionLocal() as db:
+            stmt = select(Repository).filter(Repository.id == repo_id)
+            result = await db.execute(stmt)
+            repo = result.scalars().first()
+            if not repo:
+                print(f"Repository {repo_id} not found")
+                return None
+
+            engine = ContextEngine(db, get_llm_client(settings.CHAT_MODEL))
+            head_sha = await engine.sync_repository_index(repo, repo_path)
+            
+            # API hosts rebuild their local index of the repo on its next query
+            await local_index.bump_generation(repo.id)
+            return head_sha
+
+    head_sha = run_async(_index())
+    print(f"Indexed repo_id {repo_id} at {head_sha}")
+    return {"status": "completed", "repo_id": repo_id, "commit_sha": head_sha}
 
-    asyncio.run(_sync_issues())
-    return {"status": "completed"}